@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+USER_KEY = 'auth-user:{}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша.
+
+    AuthenticationMiddleware вызывает get_user на каждом запросе;
+    с кэшем это обходится без SELECT из auth_user. Запись сбрасывается
+    при сохранении и удалении пользователя (см. forget_cached_users).
+    При промахе пользователь читается из основной базы, а не с
+    реплики: отстающая копия (ещё активная или со старым паролем)
+    осталась бы в кэше на AUTH_USER_CACHE_TIMEOUT.
+    """
+
+    def get_user(self, user_id):
+        key = USER_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = User._default_manager.db_manager(
+                    DEFAULT_DB_ALIAS
+                ).get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def forget_cached_users(user_ids):
+    """Сбрасывает кэш пользователей; нужен после update() в обход save()."""
+    cache.delete_many([USER_KEY.format(user_id) for user_id in user_ids])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_cached_users([instance.pk])
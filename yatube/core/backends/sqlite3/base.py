@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite для продакшена: PRAGMA из SQLITE_PRAGMAS и BEGIN IMMEDIATE.
+
+    Транзакции сразу берут блокировку на запись, поэтому ожидание
+    другого писателя укладывается в busy_timeout, а не заканчивается
+    ошибкой «database is locked» при попытке повысить блокировку
+    в середине транзакции.
+    """
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        # Так transaction.atomic() открывает транзакцию на SQLite.
+        self.cursor().execute('BEGIN IMMEDIATE')
+
+    def _set_autocommit(self, autocommit):
+        with self.wrap_database_errors:
+            self.connection.isolation_level = (
+                None if autocommit else 'IMMEDIATE'
+            )
@@ -0,0 +1,40 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """Общий для процесса пул фоновых потоков."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='yatube-background',
+            )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    # Результат задачи никто не ждёт, поэтому ошибку нужно записать в лог:
+    # иначе она молча осталась бы в Future.
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой', func)
+        raise
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Выполняет func в общем фоновом пуле потоков."""
+    return get_executor().submit(_run, func, args, kwargs)
@@ -0,0 +1,271 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from itertools import islice
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    # Число ключей поддерживается триггерами, чтобы проверка
+    # переполнения не считала таблицу целиком.
+    'CREATE TABLE IF NOT EXISTS cache_size (entries INTEGER NOT NULL)',
+    'INSERT INTO cache_size SELECT COUNT(*) FROM cache '
+    'WHERE NOT EXISTS (SELECT 1 FROM cache_size)',
+    'CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_size SET entries = entries + 1; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_size SET entries = entries - 1; END',
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+# Ограничение SQLite на число параметров в одном запросе.
+CHUNK_SIZE = 500
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def chunks(items, size=CHUNK_SIZE):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode(value):
+    """Целые числа хранятся как INTEGER, чтобы incr шёл одним UPDATE."""
+    if type(value) is int and MIN_INTEGER <= value <= MAX_INTEGER:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(raw):
+    if isinstance(raw, int):
+        return raw
+    return pickle.loads(raw)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов на хосте.
+
+    Файл открывается в режиме WAL: читатели не блокируют писателя,
+    а каждый процесс и поток держит своё соединение. Поддерживаются
+    время жизни ключей, атомарные add и incr и вытеснение давно не
+    читанных ключей (LRU) сверх MAX_ENTRIES.
+
+    Дополнительные OPTIONS:
+    CULL_EVERY — раз во сколько записей проверять переполнение;
+    TOUCH_INTERVAL — не чаще какого интервала (в секундах) обновлять
+    время последнего чтения ключа, чтобы чтения не превращались в записи.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        self._touch_interval = float(options.get('TOUCH_INTERVAL', 1))
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _written(self, count=1):
+        self._writes += count
+        if self._writes >= self._cull_every:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        connection = self._connection()
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', [time.time()]
+        )
+        if not self._max_entries:
+            return
+        count = connection.execute(
+            'SELECT entries FROM cache_size'
+        ).fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        excess = count - self._max_entries
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?'
+            ')',
+            [max(excess, count // self._cull_frequency)],
+        )
+
+    def _touch_read(self, keys, now):
+        if not keys:
+            return
+        self._connection().executemany(
+            'UPDATE cache SET accessed = ? WHERE key = ?',
+            [(now, key) for key in keys],
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+            ' expires = excluded.expires, accessed = excluded.accessed '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            [key, encode(value), self._expires(timeout), now, now],
+        )
+        added = cursor.rowcount > 0
+        if added:
+            self._written()
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def _get_many(self, keys):
+        now = time.time()
+        found, stale = {}, []
+        for chunk in chunks(keys):
+            rows = self._connection().execute(
+                'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))}) AND {ALIVE}',
+                [*chunk, now],
+            )
+            for key, value, accessed in rows:
+                found[key] = decode(value)
+                if now - accessed >= self._touch_interval:
+                    stale.append(key)
+        self._touch_read(stale, now)
+        return found
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        return {
+            keys[key]: value for key, value in self._get_many(keys).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = [
+            (self._key(key, version), encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Не INSERT OR REPLACE: замена удаляет строку без триггера
+            # DELETE, и число ключей в cache_size разошлось бы.
+            connection.executemany(
+                'INSERT INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                ' expires = excluded.expires, accessed = excluded.accessed',
+                rows,
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._written(len(rows))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            [self._expires(timeout), key, time.time()],
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        for chunk in chunks(keys):
+            self._connection().execute(
+                f'DELETE FROM cache WHERE key IN '
+                f'({", ".join("?" * len(chunk))})',
+                chunk,
+            )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            [key, time.time()],
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно увеличивает целое значение на delta.
+
+        Изменение и чтение результата идут в одной транзакции
+        BEGIN IMMEDIATE, поэтому параллельные incr из разных процессов
+        не теряют обновления.
+        """
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.execute(
+                'UPDATE cache SET value = value + ? '
+                f"WHERE key = ? AND typeof(value) = 'integer' AND {ALIVE}",
+                [delta, key, time.time()],
+            )
+            if cursor.rowcount == 0:
+                raise ValueError("Key '%s' not found" % key)
+            value = connection.execute(
+                'SELECT value FROM cache WHERE key = ?', [key]
+            ).fetchone()[0]
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
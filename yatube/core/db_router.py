@@ -0,0 +1,82 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Сессии читаются из основной базы: при промахе кэша cached_db сессия,
+# ещё не дошедшая до реплики, выглядела бы как выход из аккаунта.
+# Их запись не делает запрос «пишущим»: сессия сохраняется почти на
+# каждом запросе авторизованного пользователя, и иначе он никогда не
+# читал бы с реплик.
+PRIMARY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+def allow_replica_reads(allowed):
+    _state.allowed = allowed
+    _state.wrote = False
+
+
+def wrote():
+    """Была ли в текущем запросе запись в основную базу."""
+    return getattr(_state, 'wrote', False)
+
+
+@contextmanager
+def primary_reads():
+    """Временно направляет все чтения в основную базу.
+
+    Нужен при заполнении кэшей под версионными ключами: версия меняется
+    сразу после записи в основную базу, и страница, отрисованная по
+    отстающей реплике, хранилась бы под новой версией до следующей
+    правки.
+    """
+    allowed = getattr(_state, 'allowed', False)
+    _state.allowed = False
+    try:
+        yield
+    finally:
+        _state.allowed = allowed
+
+
+class ReplicaRouter:
+    """Направляет чтения на реплики, а записи — в основную базу.
+
+    Реплики используются, только если их разрешил ReplicaMiddleware для
+    текущего запроса. После первой записи и внутри транзакции чтения
+    идут в основную базу, чтобы видеть только что записанное.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label in PRIMARY_APPS
+            or not getattr(_state, 'allowed', False)
+            or wrote()
+            or not replicas()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_APPS:
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
@@ -0,0 +1,124 @@
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, QueryDict
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+
+from .db_router import primary_reads
+
+# Метка фрагмента в оболочке страницы: <!--fragment:имя?параметры-->.
+# Параметры закодированы как строка запроса, поэтому в них нет «>»;
+# пользовательский текст экранируется шаблонами и метку не подделает.
+MARKER = '<!--fragment:{name}?{params}-->'
+MARKER_RE = re.compile(rb'<!--fragment:([\w-]+)\?([^>]*)-->')
+MARKER_PREFIX = b'<!--fragment:'
+# Параметры запроса, от которых зависит страница ленты; остальные
+# (метки рекламных кампаний и т. п.) на ключи кэша не влияют.
+PAGE_PARAMS = ('page', 'after', 'before')
+
+_fragments = {}
+
+
+def fragment(name, template_name):
+    """Регистрирует персональный фрагмент страницы.
+
+    Функция получает запрос и параметры метки и возвращает контекст
+    шаблона; шаблон рендерится с запросом, поэтому в нём доступны
+    user и csrf_token.
+    """
+    def decorator(func):
+        _fragments[name] = (template_name, func)
+        return func
+    return decorator
+
+
+def marker(name, **params):
+    if name not in _fragments:
+        raise KeyError(f'Неизвестный фрагмент {name!r}')
+    return MARKER.format(name=name, params=urlencode(params))
+
+
+def render_fragments(request, content):
+    """Подставляет в оболочку фрагменты, отрисованные для посетителя."""
+    def render(match):
+        name = match.group(1).decode()
+        params = QueryDict(match.group(2).decode()).dict()
+        template_name, func = _fragments[name]
+        context = func(request, **params)
+        return render_to_string(template_name, context, request).encode()
+    return MARKER_RE.sub(render, content)
+
+
+# Заголовки, которые описывают конкретную передачу тела, а не страницу.
+UNCACHED_HEADERS = {'content-length', 'content-encoding'}
+
+
+def stored_headers(response):
+    """Заголовки ответа для кэша; cookie в них не входят."""
+    return [
+        (name, value) for name, value in response.items()
+        if name.lower() not in UNCACHED_HEADERS
+    ]
+
+
+def replay(content, headers):
+    """Ответ из кэша с теми же заголовками, что и у исходного."""
+    response = HttpResponse(content)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+def page_path(request):
+    """Путь страницы с параметрами из PAGE_PARAMS для ключа кэша."""
+    params = urlencode(sorted(
+        (name, request.GET[name]) for name in PAGE_PARAMS
+        if name in request.GET
+    ))
+    return f'{request.path}?{params}'
+
+
+def cached_shell(shell_key):
+    """Кэширует общую для всех посетителей оболочку страницы.
+
+    shell_key(request, *args, **kwargs) возвращает версию данных
+    страницы без учёта посетителя или None, если кэшировать нельзя.
+    Персональные части выводятся метками {% fragment %} и заполняются
+    FragmentMiddleware уже после кэша, поэтому одна оболочка подходит
+    и гостям, и авторизованным пользователям. Оболочка для кэша
+    рендерится по основной базе (см. primary_reads).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_SHELL_TIMEOUT
+            if not timeout or request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            version = shell_key(request, *args, **kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            key = 'page-shell:' + hashlib.md5(
+                f'{page_path(request)}:{version}'.encode()
+            ).hexdigest()
+            entry = cache.get(key)
+            if entry is not None:
+                return replay(entry['content'], entry['headers'])
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, {
+                    'content': response.content,
+                    'headers': stored_headers(response),
+                }, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+@fragment('header', 'includes/header.html')
+def header(request, query=''):
+    return {'query': query}
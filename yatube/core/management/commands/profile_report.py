@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import load_records, percentile
+
+
+def slowest_views(records, limit):
+    """Представления, упорядоченные по p95 длительности запроса."""
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[record['view'] or record['path']].append(record)
+    rows = []
+    for view, items in grouped.items():
+        rows.append({
+            'view': view,
+            'requests': len(items),
+            'p50_ms': percentile([item['ms'] for item in items], 50),
+            'p95_ms': percentile([item['ms'] for item in items], 95),
+            'queries': sum(len(item['sql']) for item in items) / len(items),
+            'sql_ms': sum(
+                query['ms'] for item in items for query in item['sql']
+            ) / len(items),
+            'template_ms': sum(
+                item['template_ms'] for item in items
+            ) / len(items),
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows[:limit]
+
+
+def hottest_functions(records, limit):
+    """Функции с наибольшим собственным временем по всем записям."""
+    totals = defaultdict(lambda: {'calls': 0, 'tottime_ms': 0.0})
+    for record in records:
+        for function in record['functions']:
+            total = totals[function['function']]
+            total['calls'] += function['calls']
+            total['tottime_ms'] += function['tottime_ms']
+    rows = [
+        dict(total, function=name) for name, total in totals.items()
+    ]
+    rows.sort(key=lambda row: row['tottime_ms'], reverse=True)
+    return rows[:limit]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка по записям профилировщика: самые медленные представления '
+        'и функции с наибольшим собственным временем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--dir', help='Каталог с записями (по умолчанию PROFILER_DIR).'
+        )
+
+    def handle(self, *args, **options):
+        records = load_records(options['dir'])
+        if not records:
+            raise CommandError('Записей профилировщика нет.')
+        limit = options['limit']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Самые медленные представления ({len(records)} запросов)'
+        ))
+        for row in slowest_views(records, limit):
+            self.stdout.write(
+                f'{row["view"]:<32} n={row["requests"]:<5} '
+                f'p50={row["p50_ms"]:.1f} p95={row["p95_ms"]:.1f} мс '
+                f'sql={row["queries"]:.1f}/{row["sql_ms"]:.1f} мс '
+                f'шаблоны={row["template_ms"]:.1f} мс'
+            )
+        self.stdout.write(
+            self.style.MIGRATE_HEADING('Самые затратные функции')
+        )
+        for row in hottest_functions(records, limit):
+            self.stdout.write(
+                f'{row["tottime_ms"]:>10.1f} мс {row["calls"]:>8} '
+                f'{row["function"]}'
+            )
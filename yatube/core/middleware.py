@@ -0,0 +1,168 @@
+import mimetypes
+import os
+import random
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .db_router import allow_replica_reads, wrote
+from .fragments import MARKER_PREFIX, render_fragments
+from .profiling import profile_request, save_record
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Заранее сжатые копии статики в порядке предпочтения.
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(request):
+    encodings = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        encoding, _, params = item.partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00'):
+            encodings.add(encoding.strip().lower())
+    return encodings
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT.
+
+    Если клиент принимает brotli или gzip и рядом лежит заранее сжатая
+    копия, отдаётся она. Файлы с хешем в имени кэшируются браузером
+    навсегда (immutable), остальные — на STATIC_MAX_AGE секунд.
+    Файлы, которых нет в STATIC_ROOT, передаются дальше по цепочке.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        prefix = settings.STATIC_URL
+        if (
+            settings.STATIC_ROOT
+            and request.method in ('GET', 'HEAD')
+            and request.path_info.startswith(prefix)
+        ):
+            response = self.serve(request, request.path_info[len(prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        served, encoding = path, None
+        accepted = accepted_encodings(request)
+        for candidate, suffix in STATIC_ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                served, encoding = path + suffix, candidate
+                break
+        stat = os.stat(served)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size,
+        ):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            response = FileResponse(
+                open(served, 'rb'),
+                content_type=content_type or 'application/octet-stream',
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        is_hashed = getattr(staticfiles_storage, 'is_hashed', None)
+        if is_hashed is not None and is_hashed(name):
+            patch_cache_control(
+                response, public=True, max_age=365 * 24 * 3600,
+                immutable=True,
+            )
+        else:
+            patch_cache_control(
+                response, public=True, max_age=settings.STATIC_MAX_AGE
+            )
+        return response
+
+
+class SamplingProfilerMiddleware:
+    """Профилирует случайную долю запросов (PROFILER_SAMPLE_RATE).
+
+    Для выбранного запроса сохраняются профиль cProfile, все SQL-запросы
+    с их длительностью и время рендеринга шаблонов; остальные запросы
+    проходят без накладных расходов. Сводку строит profile_report.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PROFILER_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        response, record = profile_request(self.get_response, request)
+        if record is not None:
+            save_record(record)
+        return response
+
+
+class ReplicaMiddleware:
+    """Разрешает чтение с реплик для безопасных запросов.
+
+    Пользователь, который только что что-то записал, в течение
+    REPLICA_STICKY_SECONDS читает из основной базы (read-your-writes):
+    об этом помнит cookie, так что реплики успевают догнать основную
+    базу. Запись определяется по маршрутизатору, поэтому учитываются
+    и представления, меняющие данные по GET.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sticky = settings.REPLICA_STICKY_COOKIE in request.COOKIES
+        allow_replica_reads(
+            request.method in SAFE_METHODS and not sticky
+        )
+        try:
+            response = self.get_response(request)
+            if wrote():
+                response.set_cookie(
+                    settings.REPLICA_STICKY_COOKIE, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            allow_replica_reads(False)
+        return response
+
+
+class FragmentMiddleware:
+    """Заполняет метки {% fragment %} персональными фрагментами.
+
+    Оболочка страницы может прийти из кэша, а шапка, кнопки и формы
+    конкретного посетителя отрисовываются здесь, вторым проходом.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not response.streaming
+            and response.get('Content-Type', '').startswith('text/html')
+            and MARKER_PREFIX in response.content
+        ):
+            response.content = render_fragments(request, response.content)
+        return response
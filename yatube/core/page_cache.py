@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from .db_router import primary_reads
+from .fragments import page_path, render_fragments, replay, stored_headers
+from .middleware import accepted_encodings
+
+POLL_INTERVAL = 0.05
+
+
+def single_flight(key, compute, timeout):
+    """Значение из кэша; при промахе вычисляется одним процессом.
+
+    Остальные запросы с тем же ключом ждут до PAGE_CACHE_LOCK_WAIT
+    секунд, пока значение появится в кэше, и только потом вычисляют
+    его сами. compute может вернуть None — такое значение не кэшируется.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock = f'{key}:lock'
+    deadline = time.monotonic() + settings.PAGE_CACHE_LOCK_WAIT
+    while not cache.add(lock, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return compute()
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    try:
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout)
+    finally:
+        cache.delete(lock)
+    return value
+
+
+def page_key(request, version):
+    raw = f'{page_path(request)}:{version}'
+    return 'guest-page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cached_response(request, entry):
+    if 'gzip' in accepted_encodings(request):
+        response = replay(entry['body'], entry['headers'])
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = replay(gzip.decompress(entry['body']), entry['headers'])
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cached_page(page_version):
+    """Кэширует готовые страницы для анонимных посетителей.
+
+    Ключ — путь, параметры пагинации и версия данных страницы
+    page_version(request, *args, **kwargs): правка поста, комментария,
+    группы или пользователя меняет версию, и старая запись больше не
+    читается. Тело хранится сжатым gzip и отдаётся как есть, если
+    клиент его принимает. Одновременные промахи по одной странице
+    рендерят её один раз (см. single_flight). Страница для кэша
+    рендерится по основной базе, а не по реплике (см. primary_reads).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            if (
+                not timeout
+                or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            version = page_version(request, *args, **kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            rendered = None
+
+            def render():
+                nonlocal rendered
+                with primary_reads():
+                    rendered = view(request, *args, **kwargs)
+                    if rendered.status_code != 200 or rendered.streaming:
+                        return None
+                    rendered.content = render_fragments(
+                        request, rendered.content
+                    )
+                return {
+                    'headers': stored_headers(rendered),
+                    'body': gzip.compress(rendered.content),
+                }
+
+            entry = single_flight(
+                page_key(request, version), render, timeout
+            )
+            if rendered is not None:
+                return rendered
+            return cached_response(request, entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,137 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+TEMPLATE_RENDER = (
+    Template.render.__code__.co_filename,
+    Template.render.__code__.co_firstlineno,
+    Template.render.__code__.co_name,
+)
+
+
+class SqlRecorder:
+    """Обёртка execute_wrapper: запоминает запросы и их длительность."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+def function_label(key):
+    filename, line, name = key
+    if filename == '~':
+        return name
+    return f'{filename}:{line}({name})'
+
+
+def profile_request(get_response, request):
+    """Выполняет запрос под cProfile и собирает запись для хранилища.
+
+    Время рендеринга шаблонов берётся из профиля как накопленное время
+    внешних вызовов Template.render, поэтому отдельных замеров не нужно.
+    Если профилировщик уже занят (например, другим инструментом),
+    запрос выполняется как обычно, а вместо записи возвращается None.
+    """
+    profiler = cProfile.Profile()
+    recorder = SqlRecorder()
+    try:
+        profiler.enable()
+    except ValueError:
+        return get_response(request), None
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = get_response(request)
+    finally:
+        profiler.disable()
+    duration = (time.perf_counter() - started) * 1000
+
+    stats = pstats.Stats(profiler).stats
+    template = stats.get(TEMPLATE_RENDER)
+    hottest = sorted(
+        stats.items(), key=lambda item: item[1][2], reverse=True
+    )[:settings.PROFILER_TOP_FUNCTIONS]
+    match = request.resolver_match
+    record = {
+        'created': time.time(),
+        'view': match.view_name if match else None,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'ms': round(duration, 3),
+        'template_ms': round(template[3] * 1000, 3) if template else 0,
+        'sql': recorder.queries,
+        'functions': [
+            {
+                'function': function_label(key),
+                'calls': calls,
+                'tottime_ms': round(tottime * 1000, 3),
+                'cumtime_ms': round(cumtime * 1000, 3),
+            }
+            for key, (_, calls, tottime, cumtime, _) in hottest
+        ],
+    }
+    return response, record
+
+
+def save_record(record):
+    """Сохраняет запись и удаляет самые старые сверх PROFILER_MAX_FILES."""
+    directory = settings.PROFILER_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = f'{record["created"]:.6f}-{uuid.uuid4().hex[:8]}.json'
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(record, file, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+    names = sorted(record_names(directory))
+    for stale in names[:-settings.PROFILER_MAX_FILES]:
+        try:
+            os.remove(os.path.join(directory, stale))
+        except FileNotFoundError:
+            pass
+
+
+def record_names(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [name for name in os.listdir(directory) if name.endswith('.json')]
+
+
+def load_records(directory=None):
+    directory = directory or settings.PROFILER_DIR
+    records = []
+    for name in sorted(record_names(directory)):
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as file:
+                records.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return records
@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.http import HttpResponse
+
+
+class WriteQueue:
+    """Очередь пишущих запросов процесса ограниченной длины.
+
+    Одновременно пишет один поток, остальные ждут своей очереди; если
+    ждущих уже SQLITE_WRITE_QUEUE_SIZE, новый запрос сразу получает
+    отказ, а не копит потоки и соединения.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = threading.Lock()
+        self.waiting = 0
+
+    def acquire(self):
+        with self.state:
+            if self.waiting >= settings.SQLITE_WRITE_QUEUE_SIZE:
+                return False
+            self.waiting += 1
+        try:
+            return self.lock.acquire(
+                timeout=settings.SQLITE_WRITE_QUEUE_TIMEOUT
+            )
+        finally:
+            with self.state:
+                self.waiting -= 1
+
+    def release(self):
+        self.lock.release()
+
+
+write_queue = WriteQueue()
+
+
+def is_locked_error(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def serialized_writes(view=None, *, safe_methods=False):
+    """Выполняет пишущее представление в транзакции через очередь записей.
+
+    Запросы безопасными методами (показ формы) выполняются как есть,
+    без транзакции и очереди; safe_methods=True нужен представлениям,
+    которые пишут и по GET. Остальные запросы выполняются в
+    transaction.atomic. В режиме SQLITE_PRODUCTION записи внутри
+    процесса идут по одной, а блокировки от других процессов
+    переживаются повтором BEGIN IMMEDIATE с экспоненциальной задержкой.
+    Само представление выполняется один раз: если база заблокировалась
+    уже внутри транзакции, ошибка не повторяется, иначе загруженные
+    файлы сохранялись бы заново. Поэтому у представления нет своего
+    transaction.atomic.
+    """
+    if view is None:
+        return partial(serialized_writes, safe_methods=safe_methods)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS and not safe_methods:
+            return view(request, *args, **kwargs)
+        if not settings.SQLITE_PRODUCTION:
+            with transaction.atomic():
+                return view(request, *args, **kwargs)
+        if not write_queue.acquire():
+            response = HttpResponse(
+                'Сервер перегружен, повторите попытку позже.', status=503
+            )
+            response['Retry-After'] = '1'
+            return response
+        try:
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    with transaction.atomic():
+                        started = True
+                        return view(request, *args, **kwargs)
+                except OperationalError as error:
+                    if (
+                        started
+                        or not is_locked_error(error)
+                        or attempt >= settings.SQLITE_WRITE_RETRIES
+                    ):
+                        raise
+                time.sleep(
+                    settings.SQLITE_WRITE_BACKOFF * 2 ** attempt
+                    * random.uniform(0.5, 1.5)
+                )
+                attempt += 1
+        finally:
+            write_queue.release()
+    return wrapper
+
+
+@contextmanager
+def write_slot():
+    """Очередь записей для фоновых задач: ждёт своей очереди сколько нужно.
+
+    Фоновая задача, пишущая пачками, берёт место на каждую пачку, так
+    что запросы пользователей успевают писать между ними.
+    """
+    if not settings.SQLITE_PRODUCTION:
+        yield
+        return
+    while not write_queue.acquire():
+        time.sleep(settings.SQLITE_WRITE_BACKOFF)
+    try:
+        yield
+    finally:
+        write_queue.release()
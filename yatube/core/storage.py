@@ -0,0 +1,64 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Сжимать имеет смысл только текстовые форматы: PNG, JPEG и шрифты
+# WOFF2 уже сжаты.
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+    '.ico', '.eot', '.ttf', '.otf',
+)
+# Сжатая копия сохраняется, только если она заметно меньше исходной.
+MIN_RATIO = 0.95
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени и заранее сжатыми копиями.
+
+    collectstatic пишет manifest (staticfiles.json), по которому
+    {% static %} выдаёт имена с хешем, а рядом с каждым текстовым
+    файлом — сжатые gzip и, если установлен brotli, brotli копии.
+    Их отдаёт core.middleware.StaticFilesMiddleware.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hashed_names = None
+
+    def post_process(self, paths, dry_run=False, **options):
+        self._hashed_names = None
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = {*self.hashed_files.keys(), *self.hashed_files.values()}
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data) * MIN_RATIO:
+                continue
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+
+    def is_hashed(self, name):
+        """Имя с хешем: содержимое под ним никогда не меняется."""
+        if self._hashed_names is None:
+            self._hashed_names = frozenset(self.hashed_files.values())
+        return name in self._hashed_names
@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..fragments import marker
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment(name, **params):
+    """Метка персонального фрагмента; заполняется FragmentMiddleware."""
+    return mark_safe(marker(name, **params))
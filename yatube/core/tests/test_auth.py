@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from posts.deletion import schedule_user_deletion
+
+from ..auth import CachedModelBackend
+from ..db_router import allow_replica_reads
+
+User = get_user_model()
+
+
+class CachedSessionUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('about:author')
+
+    def test_authorized_request_needs_no_session_or_user_queries(self):
+        """Сессия и пользователь читаются из кэша, без SQL"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Пользователь: Reader')
+
+    def test_saving_user_refreshes_cache(self):
+        """Сохранение пользователя сбрасывает его кэш"""
+        self.client.get(self.url)
+        self.user.username = 'Renamed'
+        self.user.save()
+        self.assertContains(self.client.get(self.url), 'Пользователь: Renamed')
+
+    def test_sessions_of_the_old_backend_stay_logged_in(self):
+        """Сессии, созданные до кэширующего бэкенда, не сбрасываются"""
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        self.assertContains(client.get(self.url), 'Пользователь: Reader')
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_cache_is_filled_from_primary(self):
+        """При промахе пользователь читается из основной базы, не с реплики"""
+        allow_replica_reads(True)
+        self.addCleanup(allow_replica_reads, False)
+        user = CachedModelBackend().get_user(self.user.pk)
+        self.assertEqual(user, self.user)
+
+
+class DeactivationTests(TransactionTestCase):
+    def test_deactivated_user_is_logged_out(self):
+        """Пользователь, поставленный на удаление, теряет вход после коммита"""
+        cache.clear()
+        user = User.objects.create_user(username='Reader')
+        client = Client()
+        client.force_login(user)
+        url = reverse('about:author')
+        client.get(url)
+        with mock.patch('posts.deletion.submit') as submit:
+            with transaction.atomic():
+                schedule_user_deletion([user.pk])
+                self.assertContains(client.get(url), 'Пользователь: Reader')
+            submit.assert_called_once()
+        self.assertContains(client.get(url), 'Войти')
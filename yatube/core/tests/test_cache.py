@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.location = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_values_are_shared_between_instances(self):
+        """Значения и очистка видны всем экземплярам с тем же файлом"""
+        other = self.make_cache()
+        self.cache.set('key', {'value': [1, 2]})
+        self.cache.set_many({'number': 5, 'text': 'строка'})
+        self.assertEqual(other.get('key'), {'value': [1, 2]})
+        self.assertEqual(
+            other.get_many(['number', 'text', 'missing']),
+            {'number': 5, 'text': 'строка'},
+        )
+        other.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_timeouts_and_add(self):
+        """Истёкшие ключи не читаются, add не перезаписывает живые"""
+        self.cache.set('short', 1, timeout=0.05)
+        self.assertFalse(self.cache.add('short', 2))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 3))
+        self.assertEqual(self.cache.get('short'), 3)
+        self.assertTrue(self.cache.touch('short', timeout=None))
+        self.cache.delete('short')
+        self.assertFalse(self.cache.has_key('short'))
+
+    def test_incr(self):
+        """incr и decr меняют целые значения и падают на отсутствующих"""
+        self.cache.set('counter', 10)
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.decr('counter', 3), 12)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_across_processes(self):
+        """Параллельные incr из разных процессов не теряются"""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_least_recently_read_keys_are_evicted(self):
+        """Сверх MAX_ENTRIES вытесняются давно не читанные ключи"""
+        cache = self.make_cache(
+            MAX_ENTRIES=3, CULL_FREQUENCY=3, CULL_EVERY=1, TOUCH_INTERVAL=0
+        )
+        for number in range(3):
+            cache.set(f'key{number}', number)
+            time.sleep(0.01)
+        cache.get('key0')
+        cache.set('key3', 3)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get_many(['key0', 'key2', 'key3']), {
+            'key0': 0, 'key2': 2, 'key3': 3,
+        })
+
+    def test_entry_count_is_tracked_without_scanning(self):
+        """Число ключей поддерживается триггерами при записи и удалении"""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.set('a', 3)
+        self.cache.add('c', 4)
+        self.cache.delete('b')
+        connection = self.cache._connection()
+        self.assertEqual(
+            connection.execute('SELECT entries FROM cache_size').fetchone(),
+            (2,),
+        )
+        self.cache.clear()
+        self.assertEqual(
+            connection.execute('SELECT entries FROM cache_size').fetchone(),
+            (0,),
+        )
@@ -0,0 +1,103 @@
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+
+from ..db_router import ReplicaRouter
+from ..fragments import cached_shell
+from ..middleware import ReplicaMiddleware
+from ..page_cache import cached_page
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def run_view(self, request, write=False):
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Post)
+                databases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+        response = ReplicaMiddleware(view)(request)
+        return databases, response
+
+    def test_safe_requests_read_from_replica(self):
+        """GET читает с реплики, POST и фоновый код — из основной базы"""
+        databases, _ = self.run_view(self.factory.get('/'))
+        self.assertEqual(databases, ['replica'])
+        databases, _ = self.run_view(self.factory.post('/'))
+        self.assertEqual(databases, [DEFAULT_DB_ALIAS])
+        self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_writer_sticks_to_primary(self):
+        """После записи пользователь какое-то время читает из основной"""
+        databases, response = self.run_view(
+            self.factory.get('/'), write=True
+        )
+        self.assertEqual(databases, ['replica', DEFAULT_DB_ALIAS])
+        cookie = response.cookies['primary_reads']
+        self.assertTrue(cookie['max-age'])
+        request = self.factory.get('/')
+        request.COOKIES['primary_reads'] = cookie.value
+        databases, _ = self.run_view(request)
+        self.assertEqual(databases, [DEFAULT_DB_ALIAS])
+
+    def test_sessions_are_read_from_primary(self):
+        """Сессии читаются из основной базы даже в безопасном запросе"""
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Session))
+            return HttpResponse()
+        ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(databases, [DEFAULT_DB_ALIAS])
+
+    def test_session_writes_do_not_stick_to_primary(self):
+        """Сохранение сессии не переводит чтения на основную базу"""
+        databases = []
+
+        def view(request):
+            self.router.db_for_write(Session)
+            databases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+        response = ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(databases, ['replica'])
+        self.assertNotIn('primary_reads', response.cookies)
+
+    def test_cached_pages_are_rendered_from_primary(self):
+        """Страница и оболочка для кэша рендерятся по основной базе"""
+        cache.clear()
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+        shell_view = cached_shell(lambda request: 'version')(view)
+        page_view = cached_page(lambda request: 'version')(view)
+
+        def guest_view(request):
+            request.user = AnonymousUser()
+            view(request)
+            page_view(request)
+            return shell_view(request)
+        ReplicaMiddleware(guest_view)(self.factory.get('/'))
+        self.assertEqual(
+            databases, ['replica', DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS]
+        )
+
+    def test_replicas_are_not_migrated(self):
+        """Миграции применяются только к основной базе"""
+        self.assertIs(self.router.allow_migrate('replica', 'posts'), False)
+        self.assertIsNone(
+            self.router.allow_migrate(DEFAULT_DB_ALIAS, 'posts')
+        )
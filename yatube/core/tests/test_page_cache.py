@@ -0,0 +1,151 @@
+import gzip
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TransactionTestCase,
+)
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+from ..page_cache import cached_page, single_flight
+
+User = get_user_model()
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи вычисляют значение один раз"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'значение'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    single_flight('key', compute, 60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['значение'] * 5)
+
+    def test_none_is_not_cached(self):
+        """None от compute не кэшируется, блокировка снимается"""
+        self.assertIsNone(single_flight('key', lambda: None, 60))
+        self.assertEqual(single_flight('key', lambda: 1, 60), 1)
+        self.assertIsNone(cache.get('key:lock'))
+
+
+class AnonymousPageCacheTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_repeated_request_is_served_compressed_without_queries(self):
+        """Повторный запрос гостя отдаётся из кэша сжатым, без SQL"""
+        url = reverse('posts:index')
+        content = self.guest_client.get(url).content
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                url + '?utm_source=mail', HTTP_ACCEPT_ENCODING='gzip'
+            )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertEqual(self.guest_client.get(url).content, content)
+
+    def test_compressed_response_has_weak_etag(self):
+        """ETag сжатого ответа слабый и не совпадает с ETag несжатого"""
+        url = reverse('posts:index')
+        plain = self.guest_client.get(url)
+        compressed = self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['ETag'], 'W/' + plain['ETag'])
+        response = self.guest_client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=compressed['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_page_keeps_response_headers(self):
+        """Страница из кэша отдаётся с заголовками исходного ответа"""
+        @cached_page(lambda request: 'version')
+        def view(request):
+            response = HttpResponse('Текст', content_type='text/plain')
+            response['X-Robots-Tag'] = 'noindex'
+            return response
+
+        request = RequestFactory().get('/page/')
+        request.user = AnonymousUser()
+        view(request)
+        response = view(request)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response['X-Robots-Tag'], 'noindex')
+        self.assertEqual(response.content, 'Текст'.encode())
+
+    def test_pages_are_keyed_by_pagination(self):
+        """Разные страницы ленты кэшируются отдельно"""
+        for number in range(12):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        url = reverse('posts:index')
+        first = self.guest_client.get(url).content
+        second = self.guest_client.get(url + '?page=2').content
+        self.assertNotEqual(first, second)
+        self.assertEqual(
+            self.guest_client.get(url + '?page=2').content, second
+        )
+
+    def test_changes_purge_dependent_pages(self):
+        """Комментарий и правка группы сбрасывают зависящие страницы"""
+        post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        group_url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        self.guest_client.get(post_url)
+        self.guest_client.get(group_url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Новый комментарий'
+        )
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(
+            self.guest_client.get(post_url), 'Новый комментарий'
+        )
+        self.assertContains(
+            self.guest_client.get(group_url), 'Новое название'
+        )
+
+    def test_authorized_users_bypass_page_cache(self):
+        """Авторизованный пользователь не получает страницу гостя"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        client = Client()
+        client.force_login(self.author)
+        self.assertContains(client.get(url), 'Пользователь: Author')
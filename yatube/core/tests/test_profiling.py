@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..profiling import load_records
+
+User = get_user_model()
+
+
+class SamplingProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(author=author, text='Пост')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.guest_client = Client()
+
+    def test_sampled_requests_are_recorded_and_rotated(self):
+        """Профиль запроса сохраняется, старые записи удаляются"""
+        with override_settings(
+            PROFILER_SAMPLE_RATE=1,
+            PROFILER_DIR=self.directory,
+            PROFILER_MAX_FILES=2,
+            PAGE_SHELL_TIMEOUT=0,
+            PAGE_CACHE_TIMEOUT=0,
+        ):
+            for _ in range(3):
+                self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        record = load_records(self.directory)[-1]
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertTrue(record['sql'])
+        self.assertTrue(record['functions'])
+        self.assertGreater(record['template_ms'], 0)
+        self.assertLessEqual(record['template_ms'], record['ms'])
+
+        out = StringIO()
+        call_command('profile_report', dir=self.directory, stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+
+    def test_requests_are_not_recorded_without_sampling(self):
+        """При нулевой доле выборки ничего не записывается"""
+        with override_settings(
+            PROFILER_SAMPLE_RATE=0, PROFILER_DIR=self.directory
+        ):
+            self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(os.listdir(self.directory), [])
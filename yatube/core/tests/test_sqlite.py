@@ -0,0 +1,126 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..backends.sqlite3.base import DatabaseWrapper
+from ..sqlite import serialized_writes, write_queue
+
+
+class ProductionBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'db.sqlite3')
+        self.wrapper = DatabaseWrapper({
+            'NAME': self.path,
+            'OPTIONS': {},
+            'TIME_ZONE': None,
+            'CONN_MAX_AGE': 0,
+            'AUTOCOMMIT': True,
+        }, alias='production')
+        self.addCleanup(self.wrapper.close)
+
+    def test_connection_uses_wal_pragmas(self):
+        """Соединение получает PRAGMA из SQLITE_PRAGMAS"""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_atomic_takes_write_lock_immediately(self):
+        """transaction.atomic сразу берёт блокировку на запись"""
+        connections['production'] = self.wrapper
+        self.addCleanup(delattr, connections._connections, 'production')
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with transaction.atomic(using='production'):
+            with self.assertRaisesMessage(
+                sqlite3.OperationalError, 'database is locked'
+            ):
+                other.execute('BEGIN IMMEDIATE')
+        other.execute('BEGIN IMMEDIATE')
+        other.rollback()
+
+
+@override_settings(SQLITE_PRODUCTION=True, SQLITE_WRITE_BACKOFF=0)
+class SerializedWritesTests(SimpleTestCase):
+    def setUp(self):
+        self.request = RequestFactory().post('/')
+        self.locked_begins = 0
+        self.begins = []
+        patcher = mock.patch('core.sqlite.transaction.atomic', self.atomic)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @contextmanager
+    def atomic(self):
+        self.begins.append(1)
+        if len(self.begins) <= self.locked_begins:
+            raise OperationalError('database is locked')
+        yield
+
+    def test_locked_begin_is_retried(self):
+        """Блокировка при начале транзакции приводит к повтору"""
+        self.locked_begins = 2
+        calls = []
+
+        @serialized_writes
+        def view(request):
+            calls.append(1)
+            return HttpResponse('ok')
+
+        self.assertEqual(view(self.request).content, b'ok')
+        self.assertEqual(len(self.begins), 3)
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(SQLITE_WRITE_RETRIES=1)
+    def test_retries_are_bounded(self):
+        """Число повторов ограничено"""
+        self.locked_begins = 5
+        view = serialized_writes(lambda request: HttpResponse())
+        with self.assertRaises(OperationalError):
+            view(self.request)
+        self.assertEqual(len(self.begins), 2)
+
+    def test_view_is_not_rerun(self):
+        """Ошибка внутри представления не повторяет его целиком"""
+        calls = []
+
+        @serialized_writes
+        def view(request):
+            calls.append(1)
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            view(self.request)
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(SQLITE_WRITE_QUEUE_SIZE=0)
+    def test_full_queue_rejects_request(self):
+        """Переполненная очередь отвечает 503 с Retry-After"""
+        view = serialized_writes(lambda request: HttpResponse())
+        response = view(self.request)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertTrue(write_queue.lock.acquire(blocking=False))
+        write_queue.release()
+
+    @override_settings(SQLITE_WRITE_QUEUE_SIZE=0)
+    def test_safe_methods_bypass_queue(self):
+        """GET выполняется без очереди и транзакции"""
+        request = RequestFactory().get('/')
+        view = serialized_writes(lambda request: HttpResponse())
+        self.assertEqual(view(request).status_code, 200)
+        self.assertFalse(self.begins)
+        writing = serialized_writes(safe_methods=True)(
+            lambda request: HttpResponse()
+        )
+        self.assertEqual(writing(request).status_code, 503)
@@ -0,0 +1,77 @@
+import gzip
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, True)
+        static = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        static.enable()
+        self.addCleanup(static.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.name = staticfiles_storage.stored_name('js/comments.js')
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic пишет manifest, имена с хешем и сжатые копии"""
+        with open(
+            os.path.join(self.static_root, 'staticfiles.json')
+        ) as manifest:
+            paths = json.load(manifest)['paths']
+        self.assertEqual(paths['js/comments.js'], self.name)
+        self.assertNotEqual(self.name, 'js/comments.js')
+        path = os.path.join(self.static_root, self.name)
+        with open(path, 'rb') as original, open(path + '.gz', 'rb') as packed:
+            self.assertEqual(gzip.decompress(packed.read()), original.read())
+        self.assertFalse(os.path.exists(
+            os.path.join(self.static_root, 'img', 'logo.png.gz')
+        ))
+
+    def test_hashed_file_is_served_compressed_and_immutable(self):
+        """Файл с хешем отдаётся сжатым и кэшируется навсегда"""
+        response = self.client.get(
+            f'/static/{self.name}', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            response['Content-Type'], mimetypes.guess_type(self.name)[0]
+        )
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        with open(os.path.join(self.static_root, self.name), 'rb') as file:
+            self.assertEqual(
+                gzip.decompress(b''.join(response.streaming_content)),
+                file.read(),
+            )
+
+    def test_unhashed_file_is_served_plain_with_short_cache(self):
+        """Без сжатия в Accept-Encoding и без хеша — обычный ответ"""
+        response = self.client.get('/static/js/comments.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get(
+            '/static/js/comments.js',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_escaping_paths_are_not_served(self):
+        """Отсутствующие файлы и выход за STATIC_ROOT дают 404"""
+        for url in ('/static/missing.css', '/static/../manage.py'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Обрывает загрузку, как только файл превысил UPLOAD_MAX_BYTES.
+
+    Ставится первым: пока лимит не превышен, части файла передаются
+    следующим обработчикам (в память или во временный файл на диске).
+    После превышения остаток тела запроса не читается, а запрос
+    отклоняется с 400, как Django делает при превышении
+    DATA_UPLOAD_MAX_MEMORY_SIZE: иначе представление получило бы форму
+    без файла и без полей после него.
+    """
+    stopped = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_BYTES:
+            self.stopped = True
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def upload_complete(self):
+        if self.stopped:
+            raise RequestDataTooBig(
+                'Загружаемый файл больше UPLOAD_MAX_BYTES.'
+            )
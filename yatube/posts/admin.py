@@ -1,22 +1,110 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
+from .deletion import schedule_post_deletion
 from .models import Comment, Follow, Group, Post
+from .paginators import ApproximatePaginator
+from .search import filter_matching
 
 
-class PostAdmin(admin.ModelAdmin):
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, берущее выбранный объект из строки списка.
+
+    Стандартный виджет ищет подпись выбранного значения отдельным
+    запросом, то есть по запросу на каждую строку list_editable.
+    """
+    loaded = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.loaded
+        if obj is None or [str(obj.pk)] != [str(item) for item in value]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, obj.pk, self.choices.field.label_from_instance(obj),
+            True, len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class LoadedAutocompleteMixin:
+    """Виджеты автодополнения в list_editable без запросов на строку."""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            ))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        form_class = super().get_changelist_form(request, **kwargs)
+
+        class ChangelistForm(form_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                for name, field in self.fields.items():
+                    widget = getattr(field.widget, 'widget', field.widget)
+                    if isinstance(widget, LoadedAutocompleteSelect):
+                        widget.loaded = getattr(self.instance, name)
+
+        return ChangelistForm
+
+
+class PostAdmin(LoadedAutocompleteMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
+    paginator = ApproximatePaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    actions = ('delete_in_background',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_feed()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_matching(queryset, search_term), False
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_in_background(self, request, queryset):
+        """Удаляет посты с комментариями пачками в фоне."""
+        post_ids = list(queryset.values_list('pk', flat=True))
+        schedule_post_deletion(post_ids)
+        self.message_user(
+            request,
+            f'Постов поставлено в очередь на удаление: {len(post_ids)}.',
+        )
+
+    delete_in_background.short_description = 'Удалить выбранные посты в фоне'
+    delete_in_background.allowed_permissions = ('delete',)
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description',)
+    search_fields = ('title', 'slug')
 
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('pk', 'post', 'author', 'text', 'created',)
+    list_select_related = ('post', 'author')
+    date_hierarchy = 'created'
+    autocomplete_fields = ('post', 'author')
+    paginator = ApproximatePaginator
+    show_full_result_count = False
 
 
 class FollowAdmin(admin.ModelAdmin):
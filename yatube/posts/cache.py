@@ -0,0 +1,47 @@
+import uuid
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{kind}:{pk}'
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def get_versions(*objects):
+    """Текущие версии объектов, заданных парами (вид, pk).
+
+    Версия — случайная метка, а не счётчик: после вытеснения ключа или
+    очистки кэша новая метка не совпадёт ни с одной из прежних, и
+    устаревшие фрагменты не оживут.
+    """
+    keys = [VERSION_KEY.format(kind=kind, pk=pk) for kind, pk in objects]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = _new_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def bump_version(kind, pk):
+    """Делает недействительными все фрагменты, зависящие от объекта."""
+    cache.set(VERSION_KEY.format(kind=kind, pk=pk), _new_version(), None)
+
+
+def bump_feed_versions(feeds):
+    """Сбрасывает версии лент (см. counters.post_feeds) для ETag."""
+    for feed in feeds:
+        bump_version('feed', feed)
+
+
+def post_card_key(post):
+    versions = get_versions(
+        ('post', post.pk),
+        ('user', post.author_id),
+        ('group', post.group_id or 0),
+    )
+    return 'post_card:{}:{}'.format(post.pk, ':'.join(versions))
@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.background import submit
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+FEED_COUNT_KEY = 'feed-count:{}'
+
+
+def get_counters(user):
+    """Счётчики пользователя; строка создаётся, если её ещё нет."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        counters, _ = UserCounters.objects.get_or_create(user=user)
+        return counters
+
+
+def change_user_counters(user_id, **deltas):
+    """Сдвигает счётчики пользователя на deltas.
+
+    Строка счётчиков создаётся только для положительных сдвигов. Если
+    её нет при уменьшении, значит, пользователь удаляется каскадом и
+    строка уже удалена: воссоздавать её и уходить в минус нельзя.
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if UserCounters.objects.filter(user_id=user_id).update(**updates):
+        return
+    if all(delta >= 0 for delta in deltas.values()):
+        UserCounters.objects.get_or_create(user_id=user_id)
+        UserCounters.objects.filter(user_id=user_id).update(**updates)
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount_all():
+    """Пересчитывает все счётчики по исходным таблицам."""
+    UserCounters.objects.bulk_create(
+        [
+            UserCounters(user_id=pk)
+            for pk in User.objects.filter(
+                counters__isnull=True
+            ).values_list('pk', flat=True).iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    UserCounters.objects.update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+    Post.objects.update(comments_count=_count(Comment.objects.all(), 'post'))
+
+
+def post_feeds(post):
+    """Ленты, в которые попадает пост (кроме лент подписчиков)."""
+    feeds = ['index', f'author:{post.author_id}']
+    if post.group_id:
+        feeds.append(f'group:{post.group_id}')
+    return feeds
+
+
+def recount_feed(feed, queryset):
+    """Точно пересчитывает большую ленту; выполняется в фоне."""
+    key = FEED_COUNT_KEY.format(feed)
+    try:
+        cache.set(
+            key, queryset.order_by().count(),
+            settings.FEED_COUNT_APPROXIMATE_TIMEOUT,
+        )
+    finally:
+        cache.delete(f'{key}:recount')
+
+
+def feed_count(feed, queryset):
+    """Число постов ленты за O(1) из кэша.
+
+    При промахе лента автора берётся из UserCounters.posts_count, а
+    лента подписок — суммой счётчиков авторов; последняя живёт
+    PAGINATOR_COUNT_TIMEOUT, так как при публикации не обновляется.
+    Остальные ленты до FEED_COUNT_EXACT_LIMIT постов считаются
+    ограниченным COUNT(*) и кэшируются на FEED_COUNT_TIMEOUT. Для
+    больших возвращается FEED_COUNT_EXACT_LIMIT + 1 («больше лимита»),
+    а полный COUNT(*) выполняется один раз в фоне (см. recount_feed);
+    точное число хранится FEED_COUNT_APPROXIMATE_TIMEOUT и между
+    пересчётами поддерживается сигналами.
+    """
+    key = FEED_COUNT_KEY.format(feed)
+    count = cache.get(key)
+    if count is not None:
+        return count
+    timeout = settings.FEED_COUNT_TIMEOUT
+    if feed.startswith('follower:'):
+        count = UserCounters.objects.filter(
+            user__following__user_id=feed.split(':', 1)[1]
+        ).aggregate(total=Coalesce(Sum('posts_count'), 0))['total']
+        timeout = settings.PAGINATOR_COUNT_TIMEOUT
+    elif feed.startswith('author:'):
+        count = UserCounters.objects.filter(
+            user_id=feed.split(':', 1)[1]
+        ).values_list('posts_count', flat=True).first() or 0
+    else:
+        limit = settings.FEED_COUNT_EXACT_LIMIT
+        count = queryset.order_by()[:limit + 1].count()
+        cache.set(key, count, timeout)
+        if count > limit and cache.add(f'{key}:recount', 1, timeout):
+            transaction.on_commit(
+                lambda: submit(recount_feed, feed, queryset)
+            )
+        return count
+    cache.set(key, count, timeout)
+    return count
+
+
+def change_feed_counts(feeds, delta):
+    """Сдвигает закэшированные числа постов лент на delta.
+
+    Отсутствующие в кэше ленты пропускаются: они будут посчитаны
+    при следующем чтении.
+    """
+    for feed in feeds:
+        key = FEED_COUNT_KEY.format(feed)
+        try:
+            if delta > 0:
+                cache.incr(key, delta)
+            else:
+                cache.decr(key, -delta)
+        except ValueError:
+            pass
+
+
+def forget_feed_count(feed):
+    cache.delete(FEED_COUNT_KEY.format(feed))
@@ -0,0 +1,194 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.auth import forget_cached_users
+from core.background import submit
+from core.sqlite import write_slot
+
+from . import counters
+from .cache import bump_feed_versions, bump_version
+from .models import Comment, Follow, Post, TimelineEntry, User
+
+
+def raw_delete(queryset):
+    """DELETE без сборщика Django: без загрузки объектов и сигналов."""
+    return queryset._raw_delete(queryset.db)
+
+
+def in_batches(step):
+    """Вызывает step(batch_size) в отдельных транзакциях до пустой пачки.
+
+    Каждая пачка — короткая транзакция, поэтому база не блокируется
+    надолго, а прерванное удаление можно просто запустить заново.
+    """
+    while True:
+        with write_slot(), transaction.atomic():
+            if not step(settings.DELETION_BATCH_SIZE):
+                return
+
+
+def delete_image_files(names):
+    """Удаляет файлы картинок и их миниатюры, если на них нет ссылок."""
+    used = set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    for name in set(names) - used:
+        default.kvstore.delete_thumbnails(ImageFile(name))
+        default_storage.delete(name)
+
+
+def change_user_counters(changes, skip_user_id):
+    """Сдвигает счётчики; счётчики удаляемого пользователя не трогаются."""
+    for user_id, deltas in changes.items():
+        if user_id != skip_user_id:
+            counters.change_user_counters(user_id, **deltas)
+
+
+def delete_post_batch(queryset, batch_size, skip_user_id=None):
+    posts = list(queryset.values('pk', 'author_id', 'group_id', 'image')[
+        :batch_size
+    ])
+    if not posts:
+        return False
+    post_ids = [post['pk'] for post in posts]
+    raw_delete(TimelineEntry.objects.filter(post_id__in=post_ids))
+    raw_delete(Comment.objects.filter(post_id__in=post_ids))
+    raw_delete(Post.objects.filter(pk__in=post_ids))
+    authors = Counter(post['author_id'] for post in posts)
+    change_user_counters({
+        author_id: {'posts_count': -count}
+        for author_id, count in authors.items()
+    }, skip_user_id)
+    feeds = Counter(
+        feed for post in posts
+        for feed in counters.post_feeds(
+            Post(author_id=post['author_id'], group_id=post['group_id'])
+        )
+    )
+    images = [post['image'] for post in posts if post['image']]
+
+    def after_commit():
+        for post_id in post_ids:
+            bump_version('post', post_id)
+        for feed, count in feeds.items():
+            counters.change_feed_counts([feed], -count)
+        bump_feed_versions(feeds)
+        if images:
+            delete_image_files(images)
+
+    transaction.on_commit(after_commit)
+    return True
+
+
+def delete_comment_batch(queryset, batch_size):
+    comments = list(queryset.values_list('pk', 'post_id')[:batch_size])
+    if not comments:
+        return False
+    raw_delete(Comment.objects.filter(pk__in=[pk for pk, _ in comments]))
+    posts = Counter(post_id for _, post_id in comments)
+    for post_id, count in posts.items():
+        counters.change_comments_count(post_id, -count)
+
+    def after_commit():
+        for post_id in posts:
+            bump_version('comments', post_id)
+
+    transaction.on_commit(after_commit)
+    return True
+
+
+def delete_follow_batch(queryset, batch_size, skip_user_id=None):
+    follows = list(queryset.values_list('pk', 'user_id', 'author_id')[
+        :batch_size
+    ])
+    if not follows:
+        return False
+    raw_delete(Follow.objects.filter(pk__in=[pk for pk, _, _ in follows]))
+    followers = Counter(author_id for _, _, author_id in follows)
+    following = Counter(user_id for _, user_id, _ in follows)
+    change_user_counters({
+        author_id: {'followers_count': -count}
+        for author_id, count in followers.items()
+    }, skip_user_id)
+    change_user_counters({
+        user_id: {'following_count': -count}
+        for user_id, count in following.items()
+    }, skip_user_id)
+
+    def after_commit():
+        for _, user_id, author_id in follows:
+            counters.forget_feed_count(f'follower:{user_id}')
+            bump_feed_versions([
+                f'follower:{user_id}',
+                f'author:{user_id}',
+                f'author:{author_id}',
+            ])
+
+    transaction.on_commit(after_commit)
+    return True
+
+
+def delete_rows_batch(queryset, batch_size):
+    pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+    if pks:
+        raw_delete(queryset.model.objects.filter(pk__in=pks))
+    return bool(pks)
+
+
+def delete_posts(post_ids):
+    """Удаляет посты пачками вместе с комментариями и записями лент."""
+    queryset = Post.objects.filter(pk__in=post_ids)
+    in_batches(lambda size: delete_post_batch(queryset, size))
+
+
+def delete_user(user_id):
+    """Удаляет пользователя со всей историей пачками.
+
+    Сборщик Django загрузил бы в память все посты, комментарии и
+    подписки пользователя и отправил бы сигнал на каждую строку.
+    Здесь зависимые строки удаляются DELETE по DELETION_BATCH_SIZE,
+    счётчики поправляются вручную, а сам пользователь удаляется
+    обычным delete(), когда ссылок на него почти не осталось.
+    """
+    in_batches(lambda size: delete_comment_batch(
+        Comment.objects.filter(author_id=user_id), size
+    ))
+    in_batches(lambda size: delete_follow_batch(
+        Follow.objects.filter(user_id=user_id), size, user_id
+    ))
+    in_batches(lambda size: delete_follow_batch(
+        Follow.objects.filter(author_id=user_id), size, user_id
+    ))
+    in_batches(lambda size: delete_post_batch(
+        Post.objects.filter(author_id=user_id), size, user_id
+    ))
+    in_batches(lambda size: delete_rows_batch(
+        TimelineEntry.objects.filter(user_id=user_id), size
+    ))
+    with write_slot(), transaction.atomic():
+        User.objects.filter(pk=user_id).delete()
+
+
+def delete_users(user_ids):
+    for user_id in user_ids:
+        delete_user(user_id)
+
+
+def schedule_user_deletion(user_ids):
+    """Блокирует пользователей сразу, а удаляет в фоне после коммита."""
+    user_ids = list(user_ids)
+    User.objects.filter(pk__in=user_ids).update(is_active=False)
+    # После коммита: иначе параллельный запрос успеет снова положить
+    # в кэш ещё активного пользователя.
+    transaction.on_commit(lambda: forget_cached_users(user_ids))
+    transaction.on_commit(lambda: submit(delete_users, user_ids))
+
+
+def schedule_post_deletion(post_ids):
+    post_ids = list(post_ids)
+    transaction.on_commit(lambda: submit(delete_posts, post_ids))
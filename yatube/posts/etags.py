@@ -0,0 +1,139 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import get_versions
+from .models import Follow, Group, Post, User
+
+# Версия, общая для всех лент: меняется при правке пользователей и
+# групп, чьи имена и названия выводятся в карточках постов.
+ALL_FEEDS = ('feed', 'all')
+
+
+def make_etag(request, *objects):
+    """ETag из версий объектов, от которых зависит страница.
+
+    В него входят пользователь и CSRF-cookie: у анонимного и
+    авторизованного посетителя разные шапки и формы, а форма
+    комментария содержит токен, действительный только с этим cookie.
+    """
+    versions = get_versions(ALL_FEEDS, *objects)
+    raw = ':'.join([
+        str(request.user.pk or 0),
+        request.META.get('CSRF_COOKIE', ''),
+        *versions,
+    ])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def viewer_versions(request):
+    """Версии, описывающие подписки посетителя (кнопки «Подписаться»)."""
+    if request.user.is_authenticated:
+        return [('feed', f'follower:{request.user.pk}')]
+    return []
+
+
+def index_objects(request):
+    return [('feed', 'index')]
+
+
+def group_objects(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [('group', group_id), ('feed', f'group:{group_id}')]
+
+
+def profile_objects(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [('user', author_id), ('feed', f'author:{author_id}')]
+
+
+def post_detail_objects(request, post_id):
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        return None
+    return [
+        ('post', post_id),
+        ('comments', post_id),
+        ('user', post['author_id']),
+        ('group', post['group_id'] or 0),
+        ('feed', f'author:{post["author_id"]}'),
+    ]
+
+
+def follow_index_objects(request):
+    authors = Follow.objects.filter(user=request.user).values_list(
+        'author_id', flat=True
+    )
+    return [('feed', f'author:{author_id}') for author_id in authors]
+
+
+def page_etag(page_objects):
+    """ETag страницы: её объекты плюс посетитель и его подписки."""
+    def etag(request, *args, **kwargs):
+        objects = page_objects(request, *args, **kwargs)
+        if objects is None:
+            return None
+        return make_etag(request, *objects, *viewer_versions(request))
+    return etag
+
+
+def page_version(page_objects):
+    """Версия данных страницы без учёта посетителя.
+
+    Ключ для cached_shell и cached_page: оболочка и страница гостя
+    одинаковы для всех, кто их видит.
+    """
+    def key(request, *args, **kwargs):
+        objects = page_objects(request, *args, **kwargs)
+        if objects is None:
+            return None
+        return ':'.join(get_versions(ALL_FEEDS, *objects))
+    return key
+
+
+index_etag = page_etag(index_objects)
+group_etag = page_etag(group_objects)
+profile_etag = page_etag(profile_objects)
+post_detail_etag = page_etag(post_detail_objects)
+follow_index_etag = page_etag(follow_index_objects)
+
+
+def conditional_page(etag_func):
+    """Отвечает 304 Not Modified, если ETag страницы не изменился.
+
+    ETag вычисляется до вызова представления, поэтому при совпадении
+    ни запросы ленты, ни рендеринг не выполняются. Ответ помечается
+    как зависящий от cookie и требующий перепроверки; страницы
+    авторизованных пользователей — ещё и как частные. У сжатого ответа
+    (из кэша страниц гостей) ETag слабый: байты тела отличаются от
+    несжатого ответа с той же версией, как и в GZipMiddleware.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            etag = response.get('ETag', '')
+            if response.has_header('Content-Encoding') and etag[:1] == '"':
+                response['ETag'] = 'W/' + etag
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -1,12 +1,37 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
 
+from .images import check_budget, process_image
 from .models import Comment, Post
 
 
+class PostImageField(forms.ImageField):
+    """Картинка с проверкой размера файла и числа пикселей до разбора."""
+
+    def to_python(self, data):
+        if data not in self.empty_values:
+            check_budget(data)
+        return super().to_python(data)
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {'image': PostImageField}
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            return process_image(image)
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            raise forms.ValidationError(
+                'Не удалось прочитать картинку: файл повреждён.',
+                code='invalid_image',
+            )
 
 
 class CommentForm(forms.ModelForm):
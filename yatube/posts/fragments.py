@@ -0,0 +1,33 @@
+from core.fragments import fragment
+
+from .forms import CommentForm
+from .models import Follow
+
+
+@fragment('switcher', 'posts/includes/switcher.html')
+def switcher(request, active):
+    return {'index': active == 'index', 'follow': active == 'follow'}
+
+
+@fragment('post_actions', 'posts/includes/post_actions.html')
+def post_actions(request, post_id, author_id):
+    return {
+        'post_id': post_id,
+        'is_author': request.user.pk == int(author_id),
+    }
+
+
+@fragment('comment_form', 'posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {'post_id': post_id, 'form': CommentForm()}
+
+
+@fragment('follow_button', 'posts/includes/follow_button.html')
+def follow_button(request, author_id, username):
+    user = request.user
+    context = {'username': username, 'show': user.pk != int(author_id)}
+    if user.is_authenticated and context['show']:
+        context['following'] = Follow.objects.filter(
+            user=user, author_id=author_id
+        ).exists()
+    return context
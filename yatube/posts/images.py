@@ -0,0 +1,131 @@
+import io
+import os
+import warnings
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, ImageSequence
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'GIF': 'gif'}
+CONTENT_TYPES = {
+    'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'GIF': 'image/gif',
+}
+
+
+def check_budget(uploaded):
+    """Отклоняет картинку по размеру файла, числу пикселей и кадров.
+
+    Размеры и число кадров берутся из заголовков без распаковки,
+    поэтому «бомба» вроде PNG 100000×100000 или GIF из тысяч кадров
+    отклоняется до того, как её начнут распаковывать.
+    """
+    if uploaded.size > settings.UPLOAD_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)s МБ.',
+            code='file_too_large',
+            params={'limit': settings.UPLOAD_MAX_BYTES // 2 ** 20},
+        )
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(uploaded) as image:
+                width, height = image.size
+                frames = getattr(image, 'n_frames', 1)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        width = height = settings.POST_IMAGE_MAX_PIXELS
+        frames = 1
+    except Exception:
+        return
+    finally:
+        uploaded.seek(0)
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)s мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+        )
+    if (
+        frames > settings.POST_IMAGE_MAX_FRAMES
+        or frames * width * height > settings.POST_IMAGE_MAX_TOTAL_PIXELS
+    ):
+        raise ValidationError(
+            'В анимации слишком много кадров.', code='too_many_frames'
+        )
+
+
+def flatten(image):
+    """RGB-копия; прозрачные области заливаются белым для JPEG."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode_still(image, output_format):
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    if output_format == 'WEBP':
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        image.save(
+            buffer, 'WEBP', quality=settings.POST_IMAGE_QUALITY, method=4
+        )
+    else:
+        flatten(image).save(
+            buffer, 'JPEG', quality=settings.POST_IMAGE_QUALITY,
+            optimize=True, progressive=True,
+        )
+    return buffer.getvalue()
+
+
+def encode_gif(image):
+    """Уменьшает все кадры анимации, сохраняя её длительность."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    frames = []
+    for frame in islice(
+        ImageSequence.Iterator(image), settings.POST_IMAGE_MAX_FRAMES
+    ):
+        frame = frame.convert('RGBA')
+        frame.thumbnail((max_side, max_side), Image.LANCZOS)
+        frames.append(frame)
+    buffer = io.BytesIO()
+    frames[0].save(
+        buffer, 'GIF', save_all=True, append_images=frames[1:],
+        loop=image.info.get('loop', 0),
+        duration=image.info.get('duration', 100),
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def process_image(uploaded):
+    """Уменьшает и пережимает загруженную картинку поста.
+
+    Фото пережимаются в POST_IMAGE_FORMAT (прогрессивный JPEG или WebP)
+    не больше POST_IMAGE_MAX_SIDE по большей стороне, без EXIF.
+    GIF остаются GIF, чтобы не терять анимацию; небольшие GIF
+    сохраняются как есть.
+    """
+    with Image.open(uploaded) as image:
+        max_side = settings.POST_IMAGE_MAX_SIDE
+        if image.format == 'GIF':
+            if max(image.size) <= max_side:
+                uploaded.seek(0)
+                return uploaded
+            output_format, content = 'GIF', encode_gif(image)
+        else:
+            output_format = settings.POST_IMAGE_FORMAT
+            content = encode_still(image, output_format)
+    name = os.path.splitext(os.path.basename(uploaded.name))[0]
+    return SimpleUploadedFile(
+        f'{name}.{EXTENSIONS[output_format]}',
+        content,
+        content_type=CONTENT_TYPES[output_format],
+    )
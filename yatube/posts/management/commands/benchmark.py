@@ -0,0 +1,261 @@
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from about import urls as about_urls
+from core.profiling import percentile
+from posts import urls as posts_urls
+from posts.models import Group, Post, UserCounters
+
+# Адрес не из INTERNAL_IPS: отладочный контекст не должен влиять на замер.
+REMOTE_ADDR = '192.0.2.1'
+PERCENTILES = (50, 95, 99)
+# Сравниваемые с эталоном метрики: время считаем по p95, он устойчивее
+# к единичным выбросам, чем p99, и чувствительнее, чем медиана.
+COMPARED = ('p95_ms', 'queries', 'sql_ms')
+
+
+def url_patterns():
+    """Имена маршрутов posts и about вместе с их шаблонами."""
+    return {
+        f'{module.app_name}:{pattern.name}': str(pattern.pattern)
+        for module in (posts_urls, about_urls)
+        for pattern in module.urlpatterns
+    }
+
+
+def sample_objects():
+    """Самые «тяжёлые» объекты базы: на них замер показателен."""
+    reader = (
+        UserCounters.objects.order_by('-following_count')
+        .select_related('user').first()
+    )
+    author = (
+        UserCounters.objects.order_by('-posts_count')
+        .select_related('user').first()
+    )
+    group = (
+        Group.objects.annotate(posts_count=Count('posts'))
+        .order_by('-posts_count').first()
+    )
+    post = Post.objects.order_by('-comments_count').first()
+    if None in (reader, author, group, post):
+        raise CommandError(
+            'База пуста: сначала заполните её командой seed.'
+        )
+    own_post = Post.objects.filter(author=reader.user).first()
+    return {
+        'user': reader.user,
+        'slug': group.slug,
+        'username': author.user.username,
+        'post_id': post.pk,
+        'own_post_id': own_post.pk if own_post else None,
+        'query': (post.text.split() or [''])[0],
+    }
+
+
+def build_url(name, route, objects):
+    """URL для маршрута или None, если подходящих объектов нет."""
+    kwargs = {
+        key: objects[key] for key in ('slug', 'username', 'post_id')
+        if f':{key}>' in route
+    }
+    if name == 'posts:post_edit':
+        if objects['own_post_id'] is None:
+            return None
+        kwargs['post_id'] = objects['own_post_id']
+    url = reverse(name, kwargs=kwargs)
+    if name == 'posts:search':
+        url += '?' + urlencode({'q': objects['query']})
+    return url
+
+
+@contextmanager
+def isolated_cache():
+    """Временный файл вместо общего кэша на время прогона.
+
+    Прогон откатывается в базе, но версии и страницы, записанные в кэш
+    при подписке и отписке, остались бы у рабочего сервера.
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-benchmark-')
+    caches = {}
+    for alias, params in settings.CACHES.items():
+        caches[alias] = dict(params)
+        if params['BACKEND'] == 'core.cache.SQLiteCache':
+            caches[alias]['LOCATION'] = os.path.join(
+                directory, f'{alias}.sqlite3'
+            )
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def measure(client, url, iterations, warmup):
+    for _ in range(warmup):
+        client.get(url)
+    durations, queries, sql_time = [], [], []
+    size = status = None
+    for _ in range(iterations):
+        # Чтения могут уйти на реплики, поэтому запросы собираются
+        # со всех соединений.
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in connections
+            ]
+            started = time.perf_counter()
+            response = client.get(url)
+            durations.append((time.perf_counter() - started) * 1000)
+        captured = [
+            query for context in contexts
+            for query in context.captured_queries
+        ]
+        queries.append(len(captured))
+        sql_time.append(sum(
+            float(query['time']) for query in captured
+        ) * 1000)
+        status = response.status_code
+        size = len(response.content)
+    result = {'url': url, 'status': status, 'bytes': size}
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(percentile(durations, percent), 3)
+    result['queries'] = max(queries)
+    result['sql_ms'] = round(percentile(sql_time, 50), 3)
+    return result
+
+
+def regressions(results, baseline, threshold, min_ms):
+    """Метрики, выросшие относительно эталона больше чем на threshold.
+
+    Для времени дополнительно требуется абсолютный рост не меньше
+    min_ms, иначе шум на быстрых страницах будет ронять проверку.
+    """
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in COMPARED:
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new <= old * (1 + threshold):
+                continue
+            if metric.endswith('_ms') and new - old < min_ms:
+                continue
+            found.append(f'{name}: {metric} {old} -> {new}')
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку (p50/p95/p99), число и время SQL-запросов и '
+        'размер ответа для каждого маршрута posts и about на текущей базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--output', help='Файл, в который записать результаты в JSON.'
+        )
+        parser.add_argument(
+            '--baseline', help='JSON предыдущего прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый относительный рост метрики (0.2 — 20%%).',
+        )
+        parser.add_argument(
+            '--min-ms', type=float, default=2.0,
+            help='Рост времени меньше этого значения не считается.',
+        )
+        parser.add_argument(
+            '--page-cache', action='store_true',
+            help='Не отключать кэш оболочек и страниц гостей.',
+        )
+        parser.add_argument(
+            'routes', nargs='*',
+            help='Маршруты вида posts:index; по умолчанию все.',
+        )
+
+    def handle(self, *args, **options):
+        routes = url_patterns()
+        names = options['routes'] or list(routes)
+        unknown = set(names) - set(routes)
+        if unknown:
+            raise CommandError(
+                'Неизвестные маршруты: ' + ', '.join(sorted(unknown))
+            )
+        results = {}
+        # После прогрева страницы отдавались бы из кэша оболочек и
+        # страниц гостей без единого запроса, и замедление представления
+        # не было бы видно; по умолчанию эти кэши отключены.
+        page_caches = {} if options['page_cache'] else {
+            'PAGE_SHELL_TIMEOUT': 0, 'PAGE_CACHE_TIMEOUT': 0,
+        }
+        # Часть маршрутов меняет данные (подписка, отписка), поэтому
+        # весь прогон откатывается.
+        with isolated_cache(), override_settings(**page_caches), \
+                transaction.atomic():
+            objects = sample_objects()
+            client = Client(REMOTE_ADDR=REMOTE_ADDR)
+            client.force_login(objects['user'])
+            for name in names:
+                url = build_url(name, routes[name], objects)
+                if url is None:
+                    self.stdout.write(f'{name}: пропущен, нет данных')
+                    continue
+                result = measure(
+                    client, url, options['iterations'], options['warmup']
+                )
+                results[name] = result
+                self.stdout.write(
+                    f'{name:<24} {result["status"]} '
+                    f'p50={result["p50_ms"]:.1f} p95={result["p95_ms"]:.1f} '
+                    f'p99={result["p99_ms"]:.1f} мс '
+                    f'sql={result["queries"]}/{result["sql_ms"]:.1f} мс '
+                    f'{result["bytes"]} Б'
+                )
+            transaction.set_rollback(True)
+
+        if options['output']:
+            report = {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'iterations': options['iterations'],
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+            found = regressions(
+                results, baseline, options['threshold'], options['min_ms']
+            )
+            if found:
+                raise CommandError(
+                    'Регрессия производительности:\n' + '\n'.join(found)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
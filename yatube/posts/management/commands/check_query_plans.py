@@ -0,0 +1,114 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, TimelineEntry, UserCounters
+from posts.paginators import KeysetPaginator
+from posts.timeline import TIMELINE_KEYS
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def view_querysets():
+    """Запросы, которые выполняют представления ленты и страницы поста.
+
+    Живые посты ленты подписок (популярные авторы и история за
+    пределами подрезанной ленты) читаются запросом на каждого автора,
+    см. TimelinePaginator.author_posts.
+
+    Значения параметров произвольные: план запроса от них не зависит.
+    """
+    limit = settings.NUM_POSTS + 1
+    cursor = [timezone.now(), 1]
+    feed = KeysetPaginator(Post.objects.none(), settings.NUM_POSTS)
+    timeline = KeysetPaginator(TimelineEntry.objects.none(), 1)
+    comments = KeysetPaginator(
+        Comment.objects.none(), 1, keys=('created', 'id')
+    )
+    return {
+        'index': feed.slice_queryset(
+            Post.objects.for_feed(), None, False)[:limit],
+        'index (after)': feed.slice_queryset(
+            Post.objects.for_feed(), cursor, False)[:limit],
+        'index (before)': feed.slice_queryset(
+            Post.objects.for_feed(), cursor, True)[:limit],
+        'group_posts': feed.slice_queryset(
+            Post.objects.for_feed().filter(group_id=1), cursor, False
+        )[:limit],
+        'profile': feed.slice_queryset(
+            Post.objects.for_feed().filter(author_id=1), cursor, False
+        )[:limit],
+        'profile (following)': Follow.objects.filter(
+            user_id=1, author_id=2
+        ).values('pk')[:1],
+        'follow_index (timeline)': timeline.slice_queryset(
+            TimelineEntry.objects.filter(user_id=1), cursor, False,
+            keys=TIMELINE_KEYS,
+        ).select_related('post__author', 'post__group')[:limit],
+        'follow_index (popular)': UserCounters.objects.filter(
+            user_id__in=Follow.objects.filter(user_id=1).values('author_id'),
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True),
+        'follow_index (followed authors)': Follow.objects.filter(
+            user_id=1
+        ).values_list('author_id', flat=True),
+        'follow_index (author posts)': feed.slice_queryset(
+            Post.objects.for_feed().filter(author_id=1), cursor, False
+        )[:limit],
+        'follow_index (author posts, before)': feed.slice_queryset(
+            Post.objects.for_feed().filter(author_id=1), cursor, True
+        )[:limit],
+        'post_detail': Post.objects.for_detail().filter(pk=1),
+        'post_detail (comments)': comments.slice_queryset(
+            Comment.objects.filter(post_id=1), None, False
+        ).select_related('author')[:limit],
+        'post_comments': comments.slice_queryset(
+            Comment.objects.filter(post_id=1), cursor, False
+        ).select_related('author')[:limit],
+        'fan-out (followers)': Follow.objects.filter(
+            author_id=1
+        ).values_list('user_id', flat=True),
+    }
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan):
+    return [
+        step for step in plan
+        if FULL_SCAN.match(step) or step.startswith(TEMP_SORT)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет планы запросов лент: ни один не должен делать полный '
+        'проход по таблице или сортировку во временном B-дереве.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка поддерживается только для SQLite.')
+        failed = []
+        for name, queryset in view_querysets().items():
+            plan = query_plan(queryset)
+            problems = plan_problems(plan)
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(name))
+            for step in plan:
+                self.stdout.write(f'    {step}')
+            if problems:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                'Неудачные планы запросов: ' + ', '.join(failed)
+            )
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate_post_thumbnail
+
+CHUNK_SIZE = 500
+
+
+def generate(post_id, force):
+    try:
+        generate_post_thumbnail(post_id, force=force)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок существующих постов параллельно.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число параллельных потоков; 1 — без пула, в текущем.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать уже существующие миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        force = options['force']
+        post_ids = list(
+            Post.objects.exclude(image='').order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        if options['workers'] == 1:
+            for post_id in post_ids:
+                generate_post_thumbnail(post_id, force=force)
+        else:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                for start in range(0, len(post_ids), CHUNK_SIZE):
+                    chunk = post_ids[start:start + CHUNK_SIZE]
+                    list(pool.map(lambda pk: generate(pk, force), chunk))
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры обработаны для {len(post_ids)} постов.'
+        ))
@@ -0,0 +1,252 @@
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts.cache import bump_version
+from posts.counters import FEED_COUNT_KEY, recount_all
+from posts.etags import ALL_FEEDS
+from posts.models import Comment, Follow, Group, Post, User
+from posts.timeline import rebuild_timelines
+
+PHRASES = 2000
+IMAGES = 20
+PASSWORD = 'yatube-seed'
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временно отключает auto_now_add, чтобы задать даты самим."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def power_law_weights(rng, amount, alpha):
+    """Накопленные веса по закону Парето: немногие получают почти всё."""
+    return list(accumulate(rng.paretovariate(alpha) for _ in range(amount)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных проверок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинкой, от 0 до 1.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days']).total_seconds()
+        self.phrases = [self.fake.sentence() for _ in range(PHRASES)]
+
+        user_ids = self.timed('Пользователи', self.create_users,
+                              options['users'])
+        group_ids = self.timed('Группы', self.create_groups,
+                               options['groups'])
+        images = self.create_images() if options['images'] else []
+        post_ids = self.timed('Посты', self.create_posts, options['posts'],
+                              user_ids, group_ids, images, options['images'])
+        self.timed('Комментарии', self.create_comments, options['comments'],
+                   user_ids, post_ids)
+        self.timed('Подписки', self.create_follows, options['follows'],
+                   user_ids)
+        self.timed('Счётчики', recount_all)
+        self.timed('Ленты подписок', rebuild_timelines)
+        self.timed('Кэш', self.invalidate_cache, user_ids, group_ids)
+
+    def invalidate_cache(self, user_ids, group_ids):
+        """Сбрасывает кэш: bulk_create обходит сигналы инвалидации.
+
+        Общая версия лент входит в ключи всех страниц, оболочек и ETag,
+        а числа постов лент удаляются и будут посчитаны заново.
+        """
+        bump_version(*ALL_FEEDS)
+        feeds = ['index']
+        feeds.extend(f'group:{pk}' for pk in group_ids)
+        for pk in user_ids:
+            feeds.extend((f'author:{pk}', f'follower:{pk}'))
+        cache.delete_many([FEED_COUNT_KEY.format(feed) for feed in feeds])
+
+    def timed(self, title, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        self.stdout.write(
+            f'{title}: {time.monotonic() - started:.1f} с'
+        )
+        return result
+
+    def bulk_create(self, model, objects):
+        """Вставляет объекты пачками, каждая пачка — в своей транзакции."""
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                self.insert(model, batch)
+                batch = []
+        if batch:
+            self.insert(model, batch)
+
+    def insert(self, model, batch):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def new_ids(self, model, create):
+        last_id = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        create(last_id)
+        return list(
+            model.objects.filter(pk__gt=last_id)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def random_date(self):
+        return self.now - timedelta(seconds=self.rng.random() * self.period)
+
+    def text(self, low, high):
+        return ' '.join(
+            self.rng.choice(self.phrases)
+            for _ in range(self.rng.randint(low, high))
+        )
+
+    def create_users(self, amount):
+        password = make_password(PASSWORD)
+
+        def create(last_id):
+            self.bulk_create(User, (
+                User(
+                    username=f'seed{last_id + number}',
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    email=f'seed{last_id + number}@example.com',
+                    password=password,
+                    date_joined=self.now,
+                )
+                for number in range(1, amount + 1)
+            ))
+        return self.new_ids(User, create)
+
+    def create_groups(self, amount):
+        def create(last_id):
+            self.bulk_create(Group, (
+                Group(
+                    title=self.fake.word().capitalize(),
+                    slug=f'seed-{last_id + number}',
+                    description=self.text(1, 3),
+                )
+                for number in range(1, amount + 1)
+            ))
+        return self.new_ids(Group, create)
+
+    def create_images(self):
+        """Небольшой набор картинок, которые переиспользуются постами."""
+        names = []
+        for number in range(IMAGES):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/seed_{number}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def create_posts(self, amount, user_ids, group_ids, images, image_share):
+        authors = power_law_weights(self.rng, len(user_ids), 1.2)
+
+        def create(last_id):
+            with explicit_dates(Post._meta.get_field('pub_date')):
+                self.bulk_create(Post, (
+                    Post(
+                        author_id=self.rng.choices(
+                            user_ids, cum_weights=authors)[0],
+                        group_id=(
+                            self.rng.choice(group_ids)
+                            if group_ids and self.rng.random() < 0.7
+                            else None
+                        ),
+                        text=self.text(1, 8),
+                        pub_date=self.random_date(),
+                        image=(
+                            self.rng.choice(images)
+                            if images and self.rng.random() < image_share
+                            else ''
+                        ),
+                    )
+                    for _ in range(amount)
+                ))
+        return self.new_ids(Post, create)
+
+    def create_comments(self, amount, user_ids, post_ids):
+        if not post_ids:
+            return
+        posts = power_law_weights(self.rng, len(post_ids), 1.5)
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.bulk_create(Comment, (
+                Comment(
+                    post_id=self.rng.choices(post_ids, cum_weights=posts)[0],
+                    author_id=self.rng.choice(user_ids),
+                    text=self.text(1, 2),
+                    created=self.random_date(),
+                )
+                for _ in range(amount)
+            ))
+
+    def create_follows(self, average, user_ids):
+        """Граф подписок с предпочтительным присоединением.
+
+        Число подписок пользователя и популярность авторов распределены
+        по степенному закону, как в настоящих социальных сетях.
+        """
+        if len(user_ids) < 2:
+            return
+        popularity = power_law_weights(self.rng, len(user_ids), 1.1)
+        scale = average / 2
+
+        def follows():
+            for user_id in user_ids:
+                wanted = min(
+                    int(self.rng.paretovariate(2) * scale),
+                    len(user_ids) - 1,
+                )
+                authors = set(self.rng.choices(
+                    user_ids, cum_weights=popularity, k=wanted
+                ))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+        self.bulk_create(Follow, follows())
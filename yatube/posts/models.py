@@ -21,6 +21,33 @@ class Group(models.Model):
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'id', 'text', 'pub_date', 'image', 'author', 'group',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__slug', 'group__title',
+    )
+    DETAIL_FIELDS = FEED_FIELDS + (
+        'comments_count', 'author__counters__posts_count',
+    )
+
+    def for_feed(self):
+        """Посты вместе с автором и группой одним запросом.
+
+        Выбираются только столбцы, которые выводят карточка поста,
+        страница поста и список постов в админке.
+        """
+        return self.select_related('author', 'group').only(
+            *self.FEED_FIELDS
+        )
+
+    def for_detail(self):
+        """То же, что for_feed, плюс счётчики для страницы поста."""
+        return self.select_related('author__counters', 'group').only(
+            *self.DETAIL_FIELDS
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -50,9 +77,30 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -83,6 +131,13 @@ class Comment(models.Model):
     )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            ),
+            models.Index(fields=['created'], name='comment_created_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -113,3 +168,72 @@ class Follow(models.Model):
                 name='user != author',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя.
+
+    Заполняется при публикации поста (fan-out on write), поэтому лента
+    follow_index читается одним проходом по индексу (user, pub_date).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+        ]
+
+
+class UserCounters(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Поддерживаются сигналами в той же транзакции, что и изменения
+    Post и Follow; расхождения исправляет команда recount_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
@@ -0,0 +1,250 @@
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Page, Paginator
+from django.utils.functional import cached_property
+
+from .counters import feed_count
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page в той мере, в какой
+    он нужен шаблонам, но вместо номеров страниц хранит курсоры на
+    соседние страницы.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator:
+    """Курсорная (keyset) пагинация по паре полей в порядке убывания.
+
+    Вместо COUNT(*) и OFFSET каждая страница выбирается условием
+    «строго старше/новее курсора» и LIMIT, поэтому время ответа не
+    зависит от того, насколько глубоко пролистана лента. Курсор —
+    непрозрачная строка с упакованными значениями ключей.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.keys = keys
+
+    @cached_property
+    def count(self):
+        """Общее число объектов; вычисляется только по требованию."""
+        return self.object_list.count()
+
+    def key_values(self, obj):
+        return [getattr(obj, key) for key in self.keys]
+
+    def encode_cursor(self, obj):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self.key_values(obj)
+        ]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            values = json.loads(raw.decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursor(token)
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor(token)
+        opts = self.object_list.model._meta
+        try:
+            values = [
+                opts.get_field(key).to_python(value)
+                for key, value in zip(self.keys, values)
+            ]
+        except Exception:
+            raise InvalidCursor(token)
+        if None in values:
+            raise InvalidCursor(token)
+        return values
+
+    def slice_queryset(self, queryset, values, newer, keys=None):
+        """Сортирует queryset по ключам и отсекает строки до курсора.
+
+        Без курсора (values is None) — от самых новых строк. Для
+        newer=True строки идут по возрастанию, т.е. тоже от курсора.
+        """
+        first, second = keys or self.keys
+        if values is None:
+            return queryset.order_by(f'-{first}', f'-{second}')
+        if newer:
+            return queryset.filter(**{f'{first}__gte': values[0]}).exclude(
+                **{first: values[0], f'{second}__lte': values[1]}
+            ).order_by(first, second)
+        return queryset.filter(**{f'{first}__lte': values[0]}).exclude(
+            **{first: values[0], f'{second}__gte': values[1]}
+        ).order_by(f'-{first}', f'-{second}')
+
+    def fetch(self, values, newer, limit):
+        """Возвращает до limit объектов, начиная от курсора."""
+        return list(
+            self.slice_queryset(self.object_list, values, newer)[:limit]
+        )
+
+    def get_page(self, after=None, before=None):
+        """Возвращает страницу старше курсора after или новее before.
+
+        Некорректный курсор, как и в Paginator.get_page, не приводит
+        к ошибке: отдаётся первая страница.
+        """
+        limit = self.per_page + 1
+        try:
+            if before:
+                rows = self.fetch(self.decode_cursor(before), True, limit)
+                if len(rows) < limit:
+                    return self.get_page()
+                return CursorPage(
+                    rows[:self.per_page][::-1], self,
+                    has_next=True, has_previous=True,
+                )
+            if after:
+                rows = self.fetch(self.decode_cursor(after), False, limit)
+                return CursorPage(
+                    rows[:self.per_page], self,
+                    has_next=len(rows) > self.per_page, has_previous=True,
+                )
+        except InvalidCursor:
+            pass
+        rows = self.fetch(None, False, limit)
+        return CursorPage(
+            rows[:self.per_page], self,
+            has_next=len(rows) > self.per_page, has_previous=False,
+        )
+
+
+class WindowedPage(Page):
+    is_cursor = False
+
+    @property
+    def page_window(self):
+        return self.paginator.get_elided_page_range(self.number)
+
+
+class WindowedPaginator(Paginator):
+    """Нумерованная пагинация с «окном» ссылок и кэшем числа объектов.
+
+    Шаблону отдаются только первая и последняя страницы и несколько
+    соседних с текущей, а пропуски обозначаются ELLIPSIS. Если передан
+    count_key (ключ ленты, см. counters.feed_count), число объектов
+    читается из кэша счётчиков лент вместо COUNT(*).
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return feed_count(self.count_key, self.object_list)
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг number и по краям, с пропусками."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1
+            )
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class ApproximatePaginator(Paginator):
+    """Пагинатор админки без полного COUNT(*) на каждой странице.
+
+    До ADMIN_COUNT_EXACT_LIMIT объектов считаются точно ограниченным
+    COUNT(*). Большие выборки считаются целиком раз в
+    ADMIN_COUNT_TIMEOUT секунд для каждого набора фильтров, а между
+    пересчётами число может немного отставать от таблицы.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        limit = settings.ADMIN_COUNT_EXACT_LIMIT
+        count = queryset[:limit + 1].count()
+        if count <= limit:
+            return count
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'admin_count:' + hashlib.md5(
+            repr((sql, params)).encode()
+        ).hexdigest()
+        total = cache.get(key)
+        if total is None:
+            total = queryset.count()
+            cache.set(key, total, settings.ADMIN_COUNT_TIMEOUT)
+        return max(total, count)
@@ -0,0 +1,106 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Post
+
+SEARCH_TABLE = 'posts_post_fts'
+MAX_TERMS = 10
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def fts_query(query):
+    """Запрос FTS5: все слова обязательны, каждое ищется по префиксу.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 из пользовательского
+    ввода не интерпретируются.
+    """
+    return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def rebuild_index():
+    """Полностью перестраивает индекс по таблице постов."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) '
+                "VALUES ('rebuild')"
+            )
+
+
+def filter_matching(queryset, query):
+    """Сужает queryset постов до найденных по запросу (без ранжирования)."""
+    if not search_terms(query):
+        return queryset.none()
+    if uses_fts():
+        return queryset.extra(
+            where=[
+                f'{queryset.model._meta.db_table}.id IN ('
+                f'SELECT rowid FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s)'
+            ],
+            params=[fts_query(query)],
+        )
+    condition = Q()
+    for term in search_terms(query):
+        condition &= Q(text__icontains=term)
+    return queryset.filter(condition)
+
+
+class SearchResults:
+    """Результаты поиска, упорядоченные по релевантности (bm25).
+
+    Поддерживает count() и срезы, поэтому подходит для Paginator:
+    нужная страница идентификаторов берётся из полнотекстового индекса,
+    а сами посты — одним запросом по первичному ключу.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.match = fts_query(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        if not uses_fts():
+            return filter_matching(Post.objects.all(), self.query).count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        offset = item.start or 0
+        limit = item.stop - offset
+        if not self.match or limit <= 0:
+            return []
+        if not uses_fts():
+            return list(filter_matching(
+                Post.objects.for_feed(), self.query
+            )[offset:item.stop])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,207 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, timeline
+from .cache import bump_feed_versions, bump_version
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+# Поля автора, которые выводятся в карточках постов.
+CARD_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def after_commit(func, *args):
+    """Вызывает func(*args) после фиксации текущей транзакции.
+
+    Версии и закэшированные числа постов меняются только после
+    коммита: иначе параллельный запрос мог бы взять новую версию,
+    прочитать ещё старые строки и сохранить их под этой версией,
+    а откат оставил бы в кэше неверные числа.
+    """
+    transaction.on_commit(partial(func, *args))
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_on_follow(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_on_unfollow(sender, instance, **kwargs):
+    timeline.prune_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    after_commit(bump_version, 'post', instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    after_commit(bump_version, 'group', instance.pk)
+    after_commit(bump_version, 'feed', 'all')
+
+
+@receiver(pre_save, sender=User)
+def remember_card_fields(sender, instance, raw=False, update_fields=None,
+                         **kwargs):
+    """Запоминает, изменились ли поля автора, выводимые в карточках."""
+    instance._card_fields_changed = True
+    if not instance.pk or raw:
+        return
+    if update_fields is not None and set(update_fields).isdisjoint(
+        CARD_USER_FIELDS
+    ):
+        instance._card_fields_changed = False
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(
+        *CARD_USER_FIELDS
+    ).first()
+    instance._card_fields_changed = previous != tuple(
+        getattr(instance, field) for field in CARD_USER_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Сбрасывает страницы автора, а при смене имени — и все ленты.
+
+    Новый пользователь ещё нигде не выводится. Версия ALL_FEEDS входит
+    в ключи всех страниц, поэтому она меняется, только если изменились
+    имя или логин автора из карточек постов, а не, например, пароль.
+    """
+    if created:
+        return
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    after_commit(bump_version, 'user', instance.pk)
+    if getattr(instance, '_card_fields_changed', True):
+        after_commit(bump_version, 'feed', 'all')
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_author_cards(sender, instance, **kwargs):
+    after_commit(bump_version, 'user', instance.pk)
+    after_commit(bump_version, 'feed', 'all')
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    feeds = set(counters.post_feeds(instance))
+    feeds.update(getattr(instance, '_previous_feeds', None) or ())
+    after_commit(bump_feed_versions, feeds)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    after_commit(bump_feed_versions, counters.post_feeds(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_comments(sender, instance, **kwargs):
+    after_commit(bump_version, 'comments', instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feeds(sender, instance, **kwargs):
+    after_commit(bump_feed_versions, [
+        f'follower:{instance.user_id}',
+        f'author:{instance.user_id}',
+        f'author:{instance.author_id}',
+    ])
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counters(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user_counters(instance.author_id, posts_count=-1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_feeds(sender, instance, raw=False, **kwargs):
+    instance._previous_feeds = None
+    if instance.pk and not raw:
+        previous = Post.objects.filter(pk=instance.pk).values(
+            'author_id', 'group_id'
+        ).first()
+        if previous:
+            instance._previous_feeds = counters.post_feeds(
+                Post(**previous)
+            )
+
+
+@receiver(post_save, sender=Post)
+def count_post_in_feeds(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_feeds', None)
+    feeds = counters.post_feeds(instance)
+    if created:
+        after_commit(counters.change_feed_counts, feeds, 1)
+    elif previous is not None and previous != feeds:
+        after_commit(
+            counters.change_feed_counts, set(previous) - set(feeds), -1
+        )
+        after_commit(
+            counters.change_feed_counts, set(feeds) - set(previous), 1
+        )
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post_in_feeds(sender, instance, **kwargs):
+    after_commit(
+        counters.change_feed_counts, counters.post_feeds(instance), -1
+    )
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counters(instance.author_id, followers_count=1)
+        counters.change_user_counters(instance.user_id, following_count=1)
+        after_commit(
+            counters.forget_feed_count, f'follower:{instance.user_id}'
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_user_counters(instance.author_id, followers_count=-1)
+    counters.change_user_counters(instance.user_id, following_count=-1)
+    after_commit(
+        counters.forget_feed_count, f'follower:{instance.user_id}'
+    )
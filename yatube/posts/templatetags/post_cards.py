@@ -0,0 +1,40 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..cache import post_card_key
+from ..thumbnails import ready_post_thumbnail, schedule_post_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка поста из кэша; общая для всех лент.
+
+    Карточка поста, прочитанного с реплики, в кэш не записывается:
+    реплика может отставать от версии, под которой карточка хранится.
+    """
+    key = post_card_key(post)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            'posts/includes/post_list.html', {'post': post}
+        )
+        if post._state.db in (None, DEFAULT_DB_ALIAS):
+            cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    """Готовая миниатюра поста или заглушка, пока она создаётся."""
+    thumbnail = None
+    if post.image:
+        thumbnail = ready_post_thumbnail(post)
+        if thumbnail is None:
+            schedule_post_thumbnail(post.pk)
+    return {'post': post, 'thumbnail': thumbnail}
@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..paginators import ApproximatePaginator
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_rows(self, count):
+        authors = [
+            User.objects.create_user(username=f'user{User.objects.count()}')
+            for _ in range(count)
+        ]
+        for author in authors:
+            post = Post.objects.create(
+                author=author, text='Пост', group=self.group
+            )
+            Comment.objects.create(post=post, author=author, text='Текст')
+
+    def count_queries(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк"""
+        for model in ('post', 'comment'):
+            with self.subTest(model=model):
+                url = reverse(f'admin:posts_{model}_changelist')
+                self.create_rows(2)
+                few = self.count_queries(url)
+                self.create_rows(5)
+                self.assertEqual(self.count_queries(url), few)
+
+    def test_changelist_uses_autocomplete_and_no_full_count(self):
+        """Группа редактируется виджетом автодополнения, без полного счёта"""
+        self.create_rows(1)
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, f'<option value="{other.pk}"')
+        counts = [
+            query['sql'] for query in queries
+            if 'COUNT(*)' in query['sql'] and 'posts_post' in query['sql']
+        ]
+        self.assertTrue(counts)
+        self.assertTrue(all('LIMIT' in sql for sql in counts))
+
+    def test_users_are_deleted_through_background_action(self):
+        """Пользователи удаляются только фоновым действием"""
+        user = User.objects.create_user(username='Heavy')
+        url = reverse('admin:auth_user_changelist')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'value="delete_selected"')
+        self.assertContains(response, 'value="delete_in_background"')
+        response = self.client.post(url, {
+            'action': 'delete_in_background',
+            '_selected_action': [user.pk],
+        }, follow=True)
+        self.assertContains(response, 'поставлено в очередь на удаление')
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+
+    def test_user_delete_view_does_not_cascade(self):
+        """Страница удаления пользователя ставит его в очередь без каскада"""
+        user = User.objects.create_user(username='Heavy')
+        Post.objects.create(author=user, text='Пост')
+        url = reverse('admin:auth_user_delete', args=[user.pk])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Пост')
+        response = self.client.post(url, {'post': 'yes'}, follow=True)
+        self.assertContains(response, 'поставлен в очередь на удаление')
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        self.assertTrue(Post.objects.filter(author=user).exists())
+
+    def test_posts_are_deleted_through_background_action(self):
+        """У постов стандартное каскадное удаление заменено фоновым"""
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertNotContains(response, 'value="delete_selected"')
+        self.assertContains(response, 'value="delete_in_background"')
+
+
+class ApproximatePaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='Author')
+        for number in range(5):
+            Post.objects.create(author=author, text=f'Пост {number}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_small_counts_are_exact(self):
+        """Небольшая выборка считается точно и не кэшируется"""
+        paginator = ApproximatePaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+
+    @override_settings(ADMIN_COUNT_EXACT_LIMIT=3)
+    def test_large_counts_are_cached(self):
+        """Большая выборка считается целиком один раз и кэшируется"""
+        self.assertEqual(ApproximatePaginator(Post.objects.all(), 2).count, 5)
+        Post.objects.filter(pk=Post.objects.first().pk).delete()
+        self.assertEqual(ApproximatePaginator(Post.objects.all(), 2).count, 5)
+        filtered = Post.objects.filter(text__startswith='Пост')
+        self.assertEqual(ApproximatePaginator(filtered, 2).count, 4)
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+
+from ..cache import VERSION_KEY
+from ..management.commands.benchmark import regressions
+from ..models import Follow
+
+
+class BenchmarkCommandTests(TransactionTestCase):
+    # measure собирает запросы со всех баз, включая реплики. Внутри
+    # транзакции TestCase реплика-зеркало SQLite упиралась бы
+    # в блокировки таблиц, которые пишет основное соединение.
+    databases = '__all__'
+
+    def setUp(self):
+        call_command(
+            'seed', users=10, groups=2, posts=40, comments=40, follows=4,
+            stdout=StringIO(),
+        )
+        self.output = tempfile.NamedTemporaryFile(
+            suffix='.json', delete=False
+        ).name
+        self.addCleanup(os.remove, self.output)
+
+    def benchmark(self, *routes, **options):
+        call_command(
+            'benchmark', *routes, **{
+                'iterations': 2, 'warmup': 0, 'output': self.output,
+                'stdout': StringIO(), **options,
+            },
+        )
+        with open(self.output, encoding='utf-8') as file:
+            return json.load(file)['results']
+
+    def test_benchmark_covers_all_routes(self):
+        """Замер записывает метрики каждого маршрута и не меняет данные"""
+        follows = Follow.objects.count()
+        results = self.benchmark()
+        self.assertIn('posts:index', results)
+        self.assertIn('posts:follow_index', results)
+        self.assertIn('about:tech', results)
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLess(result['status'], 500)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                if result['status'] == 200:
+                    self.assertGreater(result['bytes'], 0)
+        self.assertEqual(results['posts:index']['status'], 200)
+        self.assertGreater(results['posts:index']['queries'], 0)
+        self.assertEqual(Follow.objects.count(), follows)
+
+    def test_warm_pages_are_rendered_by_the_view(self):
+        """После прогрева страница рендерится, а не берётся из кэша"""
+        results = self.benchmark('posts:index', warmup=1)
+        self.assertGreater(results['posts:index']['queries'], 0)
+        results = self.benchmark('posts:index', warmup=1, page_cache=True)
+        self.assertEqual(results['posts:index']['queries'], 0)
+
+    def test_benchmark_leaves_shared_cache_untouched(self):
+        """Прогон пишет во временный кэш, а не в общий"""
+        cache.clear()
+        cache.set('marker', 1)
+        self.benchmark('posts:index', 'posts:profile_follow')
+        self.assertEqual(cache.get('marker'), 1)
+        self.assertFalse(cache.has_key(VERSION_KEY.format(
+            kind='feed', pk='index'
+        )))
+
+    def test_benchmark_fails_on_regression(self):
+        """Рост метрик сверх порога относительно эталона — ошибка"""
+        results = self.benchmark('posts:index')
+        baseline = dict(results['posts:index'], queries=0)
+        with open(self.output, 'w', encoding='utf-8') as file:
+            json.dump({'results': {'posts:index': baseline}}, file)
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark', 'posts:index', iterations=2, warmup=0,
+                baseline=self.output, stdout=StringIO(),
+            )
+
+    def test_regressions_ignore_small_time_changes(self):
+        """Небольшой абсолютный рост времени не считается регрессией"""
+        baseline = {'index': {'p95_ms': 1.0, 'queries': 3, 'sql_ms': 0.5}}
+        results = {'index': {'p95_ms': 1.5, 'queries': 3, 'sql_ms': 0.6}}
+        self.assertEqual(regressions(results, baseline, 0.2, 2.0), [])
+        results['index']['p95_ms'] = 10.0
+        self.assertEqual(len(regressions(results, baseline, 0.2, 2.0)), 1)
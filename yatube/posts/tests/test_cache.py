@@ -2,31 +2,80 @@ from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, TransactionTestCase
 from django.urls import reverse
 
-from ..models import Post
+from ..cache import get_versions, post_card_key
+from ..models import Group, Post
 
 User = get_user_model()
 
 
-class PostsCacheTests(TestCase):
+class PostsCacheTests(TransactionTestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.user = User.objects.create_user(username='User')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
         self.post = Post.objects.create(
             author=self.user,
             text='Тестовый текст',
+            group=self.group,
         )
         self.guest_client = Client()
+        cache.clear()
 
-    def test_cache_index(self):
-        """Проверяем корректность работы кэша в шаблоне index.html"""
+    def get_index(self):
         response = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(response.status_code, HTTPStatus.OK)
-        self.assertIn(self.post.text, response.content.decode())
+        return response.content.decode()
+
+    def test_cache_index(self):
+        """Удалённый пост сразу пропадает с главной страницы"""
+        self.assertIn(self.post.text, self.get_index())
         self.post.delete()
-        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn(self.post.text, self.get_index())
+
+    def test_post_card_is_cached(self):
+        """Карточка поста берётся из кэша, пока пост не изменился"""
+        self.get_index()
+        self.assertIsNotNone(cache.get(post_card_key(self.post)))
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        self.assertIn(self.post.text, self.get_index())
+
+    def test_post_card_is_invalidated_on_change(self):
+        """Изменение поста, группы или автора сразу видно в ленте"""
+        self.get_index()
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertIn('Новый текст', self.get_index())
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertIn('Новое название', self.get_index())
+        self.user.first_name = 'Автор'
+        self.user.save()
+        self.assertIn('Автор', self.get_index())
+
+    def test_post_card_is_shared_between_feeds(self):
+        """Одна и та же карточка обслуживает разные ленты"""
+        self.get_index()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        )
         self.assertIn(self.post.text, response.content.decode())
-        cache.clear()
-        response = self.guest_client.get(reverse('posts:index'))
-        self.assertNotIn(self.post.text, response.content.decode())
+
+    def test_feeds_survive_signup_and_password_change(self):
+        """Регистрация и смена пароля не сбрасывают кэш всех лент"""
+        version = get_versions(('feed', 'all'))
+        user = User.objects.create_user(username='Newcomer')
+        user.set_password('новый-пароль')
+        user.save()
+        self.assertEqual(get_versions(('feed', 'all')), version)
+        user.username = 'Renamed'
+        user.save()
+        self.assertNotEqual(get_versions(('feed', 'all')), version)
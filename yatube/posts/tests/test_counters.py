@@ -0,0 +1,187 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cache import get_versions
+from ..counters import feed_count
+from ..models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.guest_client = Client()
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_posts_comments_and_follows(self):
+        """Счётчики меняются при создании и удалении объектов"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+
+    def test_deleting_user_with_follows_keeps_counters_valid(self):
+        """Удаление пользователя с подписками не ломает счётчики"""
+        author_id = self.author.pk
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=other)
+        self.author.delete()
+        self.assertFalse(UserCounters.objects.filter(user_id=author_id))
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+        self.assertEqual(self.counters(other).followers_count, 0)
+
+    def test_recount_counters_fixes_drift(self):
+        """Команда recount_counters исправляет расхождения"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserCounters.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        Post.objects.update(comments_count=7)
+        call_command('recount_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.author).following_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+
+    def test_pages_do_not_run_aggregate_queries(self):
+        """Страница поста и шапка профиля обходятся без COUNT(*)"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        urls = [
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.author.username}
+            ),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    self.guest_client.get(url)
+                self.assertFalse([
+                    query for query in context.captured_queries
+                    if 'COUNT(' in query['sql'].upper()
+                ])
+
+
+class FeedCountTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def test_feed_counts_follow_posts(self):
+        """Числа постов лент меняются вместе с постами без COUNT(*)"""
+        feeds = {
+            'index': Post.objects.all(),
+            f'group:{self.group.pk}': self.group.posts.all(),
+            f'author:{self.author.pk}': self.author.posts.all(),
+        }
+        for feed, queryset in feeds.items():
+            self.assertEqual(feed_count(feed, queryset), 0)
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        with self.assertNumQueries(0):
+            for feed, queryset in feeds.items():
+                self.assertEqual(feed_count(feed, queryset), 1)
+        post.group = None
+        post.save()
+        self.assertEqual(feed_count(f'group:{self.group.pk}', None), 0)
+        self.assertEqual(feed_count('index', None), 1)
+        post.delete()
+        self.assertEqual(feed_count('index', None), 0)
+        self.assertEqual(feed_count(f'author:{self.author.pk}', None), 0)
+
+    def test_versions_and_counts_change_after_commit(self):
+        """Версии и числа постов лент меняются только после коммита"""
+        self.assertEqual(feed_count('index', Post.objects.all()), 0)
+        version = get_versions(('feed', 'index'))
+        with transaction.atomic():
+            Post.objects.create(author=self.author, text='Пост')
+            self.assertEqual(get_versions(('feed', 'index')), version)
+            self.assertEqual(feed_count('index', None), 0)
+        self.assertNotEqual(get_versions(('feed', 'index')), version)
+        self.assertEqual(feed_count('index', None), 1)
+
+    def test_rollback_keeps_versions_and_counts(self):
+        """Откат публикации не меняет ни версии, ни числа постов"""
+        self.assertEqual(feed_count('index', Post.objects.all()), 0)
+        version = get_versions(('feed', 'index'))
+        with transaction.atomic():
+            Post.objects.create(author=self.author, text='Пост')
+            transaction.set_rollback(True)
+        self.assertEqual(get_versions(('feed', 'index')), version)
+        self.assertEqual(feed_count('index', None), 0)
+
+    def test_follower_feed_count_uses_author_counters(self):
+        """Лента подписок считается по счётчикам авторов"""
+        Post.objects.create(author=self.author, text='Пост')
+        feed = f'follower:{self.reader.pk}'
+        self.assertEqual(feed_count(feed, None), 0)
+        Follow.objects.create(user=self.reader, author=self.author)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(feed_count(feed, None), 1)
+        self.assertNotIn('posts_post"', context.captured_queries[0]['sql'])
+
+    @override_settings(FEED_COUNT_EXACT_LIMIT=2)
+    def test_large_feed_is_recounted_in_background(self):
+        """Большая лента сразу получает «больше лимита», точно — в фоне"""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(5)
+        )
+        with mock.patch(
+            'posts.counters.transaction.on_commit', lambda func: func()
+        ), mock.patch(
+            'posts.counters.submit', lambda func, *args: func(*args)
+        ):
+            self.assertEqual(feed_count('index', Post.objects.all()), 3)
+        self.assertEqual(feed_count('index', None), 5)
+        Post.objects.create(author=self.author, text='Пост')
+        with self.assertNumQueries(0):
+            self.assertEqual(feed_count('index', Post.objects.all()), 6)
+
+    def test_author_feed_count_uses_author_counters(self):
+        """Лента автора считается по его счётчику постов"""
+        Post.objects.create(author=self.author, text='Пост')
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(feed_count(f'author:{self.author.pk}', None), 1)
+        self.assertNotIn('posts_post"', context.captured_queries[0]['sql'])
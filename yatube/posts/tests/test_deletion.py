@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TransactionTestCase, override_settings
+
+from core.background import submit
+
+from ..deletion import delete_posts, delete_user
+from ..models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserCounters,
+)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(DELETION_BATCH_SIZE=2)
+class BulkDeletionTests(TransactionTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.other = User.objects.create_user(username='Other')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.other)
+        self.own_image = default_storage.save('posts/own.gif', ContentFile(
+            SMALL_GIF
+        ))
+        self.shared_image = default_storage.save(
+            'posts/shared.gif', ContentFile(SMALL_GIF)
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}', group=group,
+                image=image,
+            )
+            for number, image in enumerate(
+                [self.own_image, self.shared_image, '', '', '']
+            )
+        ]
+        self.reader_post = Post.objects.create(
+            author=self.reader, text='Пост читателя', image=self.shared_image
+        )
+        for number in range(3):
+            Comment.objects.create(
+                post=self.reader_post, author=self.author, text=f'К {number}'
+            )
+            Comment.objects.create(
+                post=self.posts[0], author=self.reader, text=f'К {number}'
+            )
+
+    def counters(self, user):
+        user.counters.refresh_from_db()
+        return user.counters
+
+    def test_user_history_is_deleted_in_batches(self):
+        """Пользователь удаляется со всей историей, счётчики верны"""
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader))
+        delete_user(self.author.pk)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.filter(author_id=self.author.pk))
+        self.assertFalse(Comment.objects.filter(author_id=self.author.pk))
+        self.assertFalse(Comment.objects.filter(post_id=self.posts[0].pk))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.reader_post.refresh_from_db()
+        self.assertEqual(self.reader_post.comments_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+        self.assertEqual(self.counters(self.other).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).posts_count, 1)
+
+    def test_missing_counters_rows_are_not_recreated(self):
+        """Отсутствующая строка счётчиков не ломает удаление подписок"""
+        UserCounters.objects.filter(user=self.other).delete()
+        delete_user(self.author.pk)
+        self.assertFalse(UserCounters.objects.filter(user=self.other))
+
+    def test_failed_job_is_logged(self):
+        """Ошибка фоновой задачи записывается в лог"""
+        def fail():
+            raise ValueError('сбой')
+
+        with self.assertLogs('core.background', 'ERROR'):
+            with self.assertRaises(ValueError):
+                submit(fail).result()
+
+    def test_orphaned_images_are_removed(self):
+        """Файлы удалённых постов удаляются, общие с другими — нет"""
+        delete_user(self.author.pk)
+        self.assertFalse(default_storage.exists(self.own_image))
+        self.assertTrue(default_storage.exists(self.shared_image))
+
+    def test_delete_posts(self):
+        """Посты удаляются вместе с комментариями, счётчик автора верен"""
+        delete_posts([post.pk for post in self.posts[:3]])
+        self.assertEqual(
+            Post.objects.filter(author=self.author).count(), 2
+        )
+        self.assertFalse(Comment.objects.filter(post_id=self.posts[0].pk))
+        self.assertEqual(self.counters(self.author).posts_count, 2)
+        self.assertFalse(default_storage.exists(self.own_image))
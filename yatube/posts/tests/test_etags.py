@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Повторный запрос с прежним ETag получает 304 без рендеринга"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.revalidate(self.guest_client, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_new_post_changes_feed_etags(self):
+        """Новый пост меняет ETag лент, в которые он попадает"""
+        etags = {
+            url: self.guest_client.get(url)['ETag'] for url in self.urls()
+        }
+        Post.objects.create(author=self.author, text='Новый', group=None)
+        index_url, group_url, profile_url, _ = self.urls()
+        for url in (index_url, profile_url):
+            with self.subTest(url=url):
+                self.assertNotEqual(
+                    self.guest_client.get(url)['ETag'], etags[url]
+                )
+        response = self.guest_client.get(
+            group_url, HTTP_IF_NONE_MATCH=etags[group_url]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_changes_post_detail_etag(self):
+        """Новый комментарий меняет ETag страницы поста"""
+        url = self.urls()[3]
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_and_authorized_variants_differ(self):
+        """Гость и авторизованный пользователь получают разные ETag"""
+        url = reverse('posts:index')
+        guest_etag = self.guest_client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=guest_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_follow_index_depends_on_followed_authors(self):
+        """ETag ленты подписок меняется при подписке и новом посте автора"""
+        url = reverse('posts:follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(
+            self.reader_client.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            304,
+        )
+        Post.objects.create(author=self.author, text='Новый')
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -1,3 +1,4 @@
+import io
 import shutil
 import tempfile
 from http import HTTPStatus
@@ -7,6 +8,7 @@ from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Comment, Group, Post
 
@@ -154,3 +156,84 @@ class PostCreateFormTests(TestCase):
             f"{reverse('posts:add_comment', kwargs={'post_id': self.post.id})}"
         )
         self.assertEqual(Comment.objects.count(), comments_count)
+
+
+def make_image(size, image_format='JPEG', **options):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+@override_settings(POST_IMAGE_MAX_SIDE=100)
+class PostImageUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user(username='Name')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, name, content):
+        return self.authorized_client.post(reverse('posts:create_post'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(name, content),
+        })
+
+    def test_photo_is_downscaled_and_reencoded(self):
+        """Фото уменьшается и пережимается в прогрессивный JPEG без EXIF"""
+        exif = Image.Exif()
+        exif[0x010F] = 'Камера'
+        self.upload('photo.png', make_image((400, 200), 'PNG', exif=exif))
+        post = Post.objects.get()
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 50))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertFalse(image.getexif())
+
+    @override_settings(UPLOAD_MAX_BYTES=1024)
+    def test_large_file_is_rejected(self):
+        """Загрузка файла больше лимита обрывается с ответом 400"""
+        response = self.upload('big.bmp', make_image((100, 100), 'BMP'))
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertFalse(Post.objects.exists())
+
+    def test_truncated_image_is_rejected(self):
+        """Обрезанный файл картинки даёт ошибку формы, а не 500"""
+        content = make_image((400, 200))
+        response = self.upload('cut.jpg', content[:len(content) // 2])
+        self.assertFormError(
+            response, 'form', 'image',
+            'Не удалось прочитать картинку: файл повреждён.',
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_FRAMES=3)
+    def test_too_many_frames_are_rejected(self):
+        """Анимация с лишними кадрами отклоняется до распаковки"""
+        frames = [
+            Image.new('RGB', (10, 10), color) for color in
+            ('red', 'green', 'blue', 'white')
+        ]
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:]
+        )
+        response = self.upload('many.gif', buffer.getvalue())
+        self.assertFormError(
+            response, 'form', 'image', 'В анимации слишком много кадров.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_are_rejected(self):
+        """Картинка с лишними пикселями отклоняется до распаковки"""
+        response = self.upload('wide.png', make_image((20, 20), 'PNG'))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 0 мегапикселей.'
+        )
+        self.assertFalse(Post.objects.exists())
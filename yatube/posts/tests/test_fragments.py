@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TransactionTestCase
+from django.urls import reverse
+
+from core.fragments import cached_shell
+
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class PageShellTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def template_names(self, response):
+        return [template.name for template in response.templates]
+
+    def test_shell_is_shared_and_fragments_are_personal(self):
+        """Оболочка из кэша общая, шапка и кнопки — свои у каждого"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        self.assertIn('posts/post_detail.html', self.template_names(response))
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, edit_url)
+        self.assertNotContains(response, '<form method="post"')
+
+        response = self.author_client.get(url)
+        self.assertNotIn(
+            'posts/post_detail.html', self.template_names(response)
+        )
+        self.assertContains(response, 'Пользователь: Author')
+        self.assertContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, '<!--fragment:')
+
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'Пользователь: Reader')
+        self.assertNotContains(response, edit_url)
+
+    def test_follow_button_reflects_viewer(self):
+        """Кнопка подписки в профиле зависит от посетителя"""
+        url = reverse('posts:profile', kwargs={'username': 'Author'})
+        self.assertContains(self.guest_client.get(url), 'Подписаться')
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+        response = self.author_client.get(url)
+        self.assertNotContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_shell_is_rebuilt_after_change(self):
+        """Изменение поста сбрасывает оболочку страницы"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertContains(self.reader_client.get(url), 'Исправленный пост')
+
+    def test_markers_in_user_text_are_not_expanded(self):
+        """Метка фрагмента в тексте поста выводится как текст"""
+        post = Post.objects.create(
+            author=self.author, text='<!--fragment:header?-->'
+        )
+        response = self.reader_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, 'Пользователь: Reader', count=1)
+        self.assertContains(response, '&lt;!--fragment:header?--&gt;')
+
+    def test_unknown_params_share_the_shell(self):
+        """Посторонние параметры запроса не создают новых оболочек"""
+        calls = []
+
+        @cached_shell(lambda request: 'version')
+        def view(request):
+            calls.append(request.GET.get('page'))
+            return HttpResponse('Оболочка')
+
+        factory = RequestFactory()
+        view(factory.get('/shell/', {'x': 'первый'}))
+        view(factory.get('/shell/', {'x': 'второй', 'utm_source': 'mail'}))
+        view(factory.get('/shell/', {'page': '2'}))
+        self.assertEqual(calls, [None, '2'])
+
+    def test_cached_shell_keeps_response_headers(self):
+        """Оболочка из кэша отдаётся с заголовками исходного ответа"""
+        calls = []
+
+        @cached_shell(lambda request: 'version')
+        def view(request):
+            calls.append(1)
+            response = HttpResponse('Текст', content_type='text/plain')
+            response['X-Robots-Tag'] = 'noindex'
+            return response
+
+        request = RequestFactory().get('/shell/')
+        view(request)
+        response = view(request)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response['X-Robots-Tag'], 'noindex')
+        self.assertEqual(response.content, 'Текст'.encode())
@@ -0,0 +1,128 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..management.commands.check_query_plans import plan_problems
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.make_author(0))
+
+    @classmethod
+    def make_author(cls, number):
+        return User.objects.create_user(
+            username=f'Author{number}',
+            first_name=f'Имя{number}',
+            last_name=f'Фамилия{number}',
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(FeedQueryCountTests.reader)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def add_posts(self, amount):
+        """Каждый пост — от нового автора, чтобы N+1 был заметен."""
+        for _ in range(amount):
+            author = self.make_author(User.objects.count())
+            Follow.objects.create(
+                user=FeedQueryCountTests.reader,
+                author=author,
+            )
+            Post.objects.create(
+                author=author,
+                group=FeedQueryCountTests.group,
+                text=f'Запись автора {author.username}',
+            )
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице"""
+        self.add_posts(1)
+        urls = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': FeedQueryCountTests.group.slug}
+            ),
+            reverse('posts:follow_index'),
+        ]
+        single = {url: self.count_queries(url) for url in urls}
+        self.add_posts(settings.NUM_POSTS)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single[url])
+
+    def test_profile_query_count_does_not_depend_on_page_size(self):
+        """Число запросов профиля не зависит от числа постов на странице"""
+        author = User.objects.get(username='Author0')
+        url = reverse('posts:profile', kwargs={'username': author.username})
+        Post.objects.create(author=author, text='Первая запись')
+        single = self.count_queries(url)
+        for number in range(settings.NUM_POSTS):
+            Post.objects.create(
+                author=author,
+                group=FeedQueryCountTests.group,
+                text=f'Тестовая запись {number}',
+            )
+        self.assertEqual(self.count_queries(url), single)
+
+    def test_post_detail_query_count_does_not_depend_on_comments(self):
+        """Число запросов страницы поста не зависит от комментариев"""
+        author = User.objects.get(username='Author0')
+        post = Post.objects.create(
+            author=author,
+            group=FeedQueryCountTests.group,
+            text='Пост с комментариями',
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        post.comments.create(author=author, text='Комментарий')
+        single = self.count_queries(url)
+        for number in range(5):
+            post.comments.create(
+                author=self.make_author(100 + number),
+                text=f'Комментарий {number}',
+            )
+        self.assertEqual(self.count_queries(url), single)
+
+
+class QueryPlanTests(TestCase):
+    def test_view_queries_use_indexes(self):
+        """Запросы лент не делают полных проходов и временных сортировок"""
+        call_command('check_query_plans', stdout=StringIO())
+
+    def test_plan_problems_detects_full_scan_and_temp_sort(self):
+        """Проверка планов распознаёт полный проход и сортировку"""
+        plan = [
+            'SCAN posts_post',
+            'SCAN TABLE posts_comment',
+            'SCAN posts_post USING INDEX post_pub_date_idx',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(
+            plan_problems(plan),
+            [plan[0], plan[1], plan[3]]
+        )
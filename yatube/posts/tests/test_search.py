@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SearchResults, filter_matching
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass'
+        )
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки спят весь день'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки гуляют весь день'
+        )
+        cls.many_cats = Post.objects.create(
+            author=cls.user, text='Кошки, кошки и ещё раз кошки'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        return self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+
+    def test_search_finds_ranked_posts(self):
+        """Поиск находит посты по словам и ранжирует их"""
+        response = self.search('кошк')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [SearchTests.many_cats, SearchTests.cats]
+        )
+        self.assertEqual(response.context['paginator'].count, 2)
+
+    def test_search_requires_all_terms(self):
+        """Все слова запроса должны встречаться в посте"""
+        response = self.search('собаки день')
+        self.assertEqual(
+            list(response.context['page_obj']), [SearchTests.dogs]
+        )
+
+    def test_search_ignores_query_syntax(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск"""
+        response = self.search('"кошки" * (')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        post = Post.objects.create(author=SearchTests.user, text='Попугаи')
+        self.assertEqual(SearchResults('попугаи').count(), 1)
+        post.text = 'Черепахи'
+        post.save()
+        self.assertEqual(SearchResults('попугаи').count(), 0)
+        self.assertEqual(SearchResults('черепахи').count(), 1)
+        post.delete()
+        self.assertEqual(SearchResults('черепахи').count(), 0)
+
+    def test_search_is_paginated(self):
+        """Результаты поиска разбиты на страницы"""
+        Post.objects.bulk_create([
+            Post(author=SearchTests.user, text=f'Хомяк номер {i}')
+            for i in range(settings.NUM_POSTS + 1)
+        ])
+        first_page = self.search('хомяк')
+        self.assertEqual(
+            len(first_page.context['page_obj']), settings.NUM_POSTS
+        )
+        second_page = self.search('хомяк', page=2)
+        self.assertEqual(len(second_page.context['page_obj']), 1)
+
+    def test_filter_matching_and_admin_search(self):
+        """Админка ищет посты по полнотекстовому индексу"""
+        self.assertEqual(
+            set(filter_matching(Post.objects.all(), 'кошки')),
+            {SearchTests.cats, SearchTests.many_cats}
+        )
+        client = Client()
+        client.force_login(SearchTests.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [SearchTests.dogs]
+        )
@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from ..cache import get_versions
+from ..counters import feed_count
+from ..etags import ALL_FEEDS
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserCounters
+
+User = get_user_model()
+
+
+def seed(**options):
+    call_command(
+        'seed', users=30, groups=3, posts=120, comments=200, follows=6,
+        batch_size=50, stdout=StringIO(), **options,
+    )
+
+
+def snapshot():
+    return (
+        list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text')),
+        list(Follow.objects.order_by('pk').values_list(
+            'user__username', 'author__username')),
+    )
+
+
+class SeedCommandTests(TestCase):
+    def test_seed_creates_consistent_dataset(self):
+        """Команда seed создаёт данные, счётчики и ленты подписок"""
+        seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+        author = Post.objects.values('author').first()['author']
+        self.assertEqual(
+            UserCounters.objects.get(user_id=author).posts_count,
+            Post.objects.filter(author_id=author).count(),
+        )
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            Post.objects.filter(author=follow.author).count(),
+        )
+
+    def test_seed_invalidates_cached_pages_and_counts(self):
+        """После seed закэшированные страницы и числа лент сбрасываются"""
+        cache.clear()
+        self.assertEqual(feed_count('index', Post.objects.all()), 0)
+        versions = get_versions(ALL_FEEDS)
+        seed()
+        self.assertNotEqual(get_versions(ALL_FEEDS), versions)
+        self.assertEqual(feed_count('index', Post.objects.all()), 120)
+
+    def test_seed_is_deterministic(self):
+        """Одинаковый --seed даёт одинаковые данные"""
+        seed(seed=7)
+        first = snapshot()
+        for model in (Comment, Follow, Post, Group):
+            model.objects.all().delete()
+        User.objects.all().delete()
+        seed(seed=7)
+        self.assertEqual(
+            [len(items) for items in snapshot()],
+            [len(items) for items in first],
+        )
+        self.assertEqual(
+            [row[2] for row in snapshot()[0]],
+            [row[2] for row in first[0]],
+        )
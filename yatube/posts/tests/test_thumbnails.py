@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..thumbnails import generate_post_thumbnail, ready_post_thumbnail
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Author')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+
+    def get_detail(self):
+        return self.authorized_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )).content.decode()
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, вместо неё выводится заглушка"""
+        self.assertIn('img/placeholder.svg', self.get_detail())
+        generate_post_thumbnail(self.post.pk)
+        content = self.get_detail()
+        self.assertNotIn('img/placeholder.svg', content)
+        self.assertIn(ready_post_thumbnail(self.post).url, content)
+
+    def test_card_is_refreshed_when_thumbnail_is_ready(self):
+        """Готовая миниатюра сразу попадает в закэшированную карточку"""
+        index = reverse('posts:index')
+        self.assertIn(
+            'img/placeholder.svg',
+            self.authorized_client.get(index).content.decode()
+        )
+        generate_post_thumbnail(self.post.pk)
+        self.assertNotIn(
+            'img/placeholder.svg',
+            self.authorized_client.get(index).content.decode()
+        )
+
+    def test_create_post_schedules_thumbnail(self):
+        """Создание поста с картинкой ставит миниатюру в очередь"""
+        with mock.patch('posts.views.schedule_post_thumbnail') as schedule:
+            self.authorized_client.post(reverse('posts:create_post'), {
+                'text': 'Новый пост',
+                'image': SimpleUploadedFile(
+                    name='new.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                ),
+            })
+        schedule.assert_called_once_with(Post.objects.first().pk)
+
+    def test_generate_thumbnails_command(self):
+        """Команда generate_thumbnails создаёт недостающие миниатюры"""
+        self.assertIsNone(ready_post_thumbnail(self.post))
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        self.assertIsNotNone(ready_post_thumbnail(self.post))
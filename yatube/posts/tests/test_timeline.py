@@ -0,0 +1,177 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..management.commands.check_query_plans import plan_problems
+from ..models import Follow, Post, TimelineEntry
+from ..timeline import trim_timelines
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Author')
+        self.other = User.objects.create_user(username='Other')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.other, post=post
+        ).exists())
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дозаполняет ленту, отписка очищает её"""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        self.reader_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader
+            ).values_list('post_id', flat=True)),
+            {post.pk for post in posts}
+        )
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    def run_trims_inline(self):
+        """Подрезка лент сразу, а не в фоне после коммита."""
+        for target, replacement in (
+            ('posts.timeline.transaction.on_commit', lambda func: func()),
+            ('posts.timeline.submit', lambda func, *args: func(*args)),
+        ):
+            patcher = mock.patch(target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @override_settings(
+        TIMELINE_MAX_ENTRIES=2, TIMELINE_TRIM_EVERY=1,
+        TIMELINE_TRIM_BATCH_SIZE=1,
+    )
+    def test_timeline_is_capped(self):
+        """Ленты подписчиков не превышают TIMELINE_MAX_ENTRIES"""
+        self.run_trims_inline()
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        for user in (self.reader, self.other):
+            with self.subTest(user=user.username):
+                self.assertEqual(
+                    list(TimelineEntry.objects.filter(
+                        user=user
+                    ).order_by('-pub_date').values_list(
+                        'post_id', flat=True
+                    )),
+                    [posts[3].pk, posts[2].pk]
+                )
+
+    @override_settings(TIMELINE_TRIM_EVERY=1)
+    def test_timelines_are_trimmed_after_commit(self):
+        """Ленты подрезаются в фоне после коммита, а не в транзакции поста"""
+        follower_ids = []
+        for number in range(20):
+            follower = User.objects.create_user(username=f'Follower{number}')
+            Follow.objects.create(user=follower, author=self.author)
+            follower_ids.append(follower.pk)
+        callbacks = []
+        with mock.patch(
+            'posts.timeline.transaction.on_commit', callbacks.append
+        ), mock.patch('posts.timeline.submit') as submit:
+            with CaptureQueriesContext(connection) as queries:
+                Post.objects.create(author=self.author, text='Пост')
+            submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+        self.assertLess(len(queries), 20)
+        submit.assert_called_once_with(trim_timelines, follower_ids)
+
+    @override_settings(TIMELINE_MAX_ENTRIES=2, TIMELINE_TRIM_EVERY=1)
+    def test_follow_index_falls_back_past_cap(self):
+        """За пределами подрезанной ленты посты берутся живым запросом"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        with self.settings(NUM_POSTS=3):
+            response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            posts[::-1][:3]
+        )
+
+    def test_short_first_page_skips_timeline_count(self):
+        """Короткая первая страница ленты не считает записи ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост')
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(reverse('posts:follow_index'))
+        self.assertFalse([
+            query['sql'] for query in queries
+            if 'COUNT(' in query['sql']
+            and 'posts_timelineentry' in query['sql']
+        ])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_live(self):
+        """Посты популярного автора не раскладываются, но видны в ленте"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Популярный')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    @override_settings(
+        TIMELINE_MAX_ENTRIES=2, TIMELINE_TRIM_EVERY=1, TIMELINE_FANOUT_LIMIT=1,
+    )
+    def test_live_posts_are_read_without_temp_sort(self):
+        """Живые посты ленты подписок читаются без временной сортировки"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.other)
+        Follow.objects.create(user=self.other, author=self.author)
+        posts = [
+            Post.objects.create(author=author, text=f'Пост {i}')
+            for i in range(3) for author in (self.author, self.other)
+        ]
+        with self.settings(NUM_POSTS=4):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.reader_client.get(
+                    reverse('posts:follow_index')
+                )
+        self.assertEqual(
+            list(response.context['page_obj']), posts[::-1][:4]
+        )
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plan = [row[-1] for row in cursor.fetchall()]
+                with self.subTest(sql=query['sql']):
+                    self.assertEqual(plan_problems(plan), [])
@@ -1,14 +1,18 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Comment, Follow, Group, Post
+from ..paginators import WindowedPaginator
 
 User = get_user_model()
 
@@ -71,6 +75,8 @@ class PostPagesTests(TestCase):
                 image=cls.uploaded,
             ))
         Post.objects.bulk_create(cls.obj)
+        # bulk_create не отправляет сигналы, счётчики пересчитываем явно
+        call_command('recount_counters', stdout=StringIO())
 
     @classmethod
     def tearDownClass(cls):
@@ -78,6 +84,7 @@ class PostPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client_2 = Client()
@@ -239,6 +246,54 @@ class PostPagesTests(TestCase):
                     response.context['paginator'].count - settings.NUM_POSTS
                 )
 
+    def test_posts_cursor_paginator_next_and_previous(self):
+        """Проверяем курсорную пагинацию: следующая и предыдущая страницы"""
+        reverse_name_list = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': PostPagesTests.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': PostPagesTests.user.username}
+            )
+        ]
+        for reverse_name in reverse_name_list:
+            with self.subTest(reverse_name=reverse_name):
+                first_page = self.guest_client.get(reverse_name)
+                page_obj = first_page.context['page_obj']
+                self.assertTrue(page_obj.has_next())
+                self.assertFalse(page_obj.has_previous())
+                second_page = self.guest_client.get(
+                    reverse_name, {'after': page_obj.next_cursor}
+                )
+                second_obj = second_page.context['page_obj']
+                self.assertEqual(
+                    len(second_obj),
+                    second_page.context['paginator'].count
+                    - settings.NUM_POSTS
+                )
+                self.assertFalse(set(page_obj) & set(second_obj))
+                self.assertFalse(second_obj.has_next())
+                previous_page = self.guest_client.get(
+                    reverse_name, {'before': second_obj.previous_cursor}
+                )
+                self.assertEqual(
+                    list(previous_page.context['page_obj']),
+                    list(page_obj)
+                )
+
+    def test_posts_cursor_paginator_invalid_cursor(self):
+        """Некорректный курсор возвращает первую страницу"""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'not-a-cursor'}
+        )
+        self.assertEqual(
+            response.context['page_obj'][0],
+            PostPagesTests.obj[len(PostPagesTests.obj) - 1]
+        )
+
     def test_posts_post_detail_show_correct_context(self):
         """Проверяем, что шаблон post_detail сформирован с правильным
         контекстом
@@ -463,3 +518,107 @@ class PostPagesTests(TestCase):
         ).exists())
         response = self.authorized_client.get(reverse('posts:follow_index'))
         self.assertNotIn(new_post, response.context['page_obj'])
+
+
+class WindowedPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_page_window_is_elided(self):
+        """Выводятся только края и соседние с текущей страницы"""
+        paginator = WindowedPaginator(range(1000), 10)
+        ellipsis = WindowedPaginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.page(50).page_window),
+            [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100],
+        )
+        self.assertEqual(
+            list(paginator.page(1).page_window),
+            [1, 2, 3, ellipsis, 100],
+        )
+        self.assertEqual(
+            list(WindowedPaginator(range(30), 10).page(2).page_window),
+            [1, 2, 3],
+        )
+
+    def test_count_is_cached_per_feed(self):
+        """Число постов ленты берётся из кэша, а не из COUNT(*)"""
+        author = User.objects.create_user(username='Author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}') for i in range(3)
+        )
+        paginator = WindowedPaginator(
+            Post.objects.all(), 10, count_key='test'
+        )
+        self.assertEqual(paginator.count, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                WindowedPaginator(
+                    Post.objects.all(), 10, count_key='test'
+                ).count,
+                3,
+            )
+
+    def test_legacy_page_renders_window(self):
+        """Старые ссылки ?page=N выводят окно страниц"""
+        author = User.objects.create_user(username='Author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}')
+            for i in range(settings.NUM_POSTS * 20)
+        )
+        response = Client().get(reverse('posts:index'), {'page': 10})
+        self.assertContains(response, '?page=20')
+        self.assertContains(response, WindowedPaginator.ELLIPSIS, count=2)
+        self.assertNotContains(response, '?page=5"')
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_latest_comments(self):
+        """На странице поста — только последние комментарии по порядку"""
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page)[::-1], self.comments[-3:])
+        self.assertTrue(page.has_next())
+        content = response.content.decode()
+        self.assertLess(
+            content.index('Комментарий 4'), content.index('Комментарий 6')
+        )
+        self.assertNotIn('Комментарий 3', content)
+
+    def test_older_comments_fragment(self):
+        """Фрагмент подгружает более ранние комментарии до самого начала"""
+        client = Client()
+        page = client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        ).context['comments']
+        loaded = list(page)
+        while page.has_next():
+            response = client.get(
+                reverse(
+                    'posts:post_comments', kwargs={'post_id': self.post.pk}
+                ),
+                {'before': page.next_cursor},
+            )
+            self.assertTemplateUsed(
+                response, 'posts/includes/comment_list.html'
+            )
+            page = response.context['comments']
+            loaded.extend(page)
+        self.assertEqual(loaded[::-1], self.comments)
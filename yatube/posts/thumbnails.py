@@ -0,0 +1,83 @@
+import threading
+
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.background import submit
+
+from .cache import bump_feed_versions, bump_version
+from .counters import post_feeds
+from .models import Post
+
+POST_GEOMETRY = '960x339'
+POST_OPTIONS = {'crop': 'center', 'upscale': True}
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None; сама миниатюра не создаётся.
+
+        Имя файла вычисляется так же, как в get_thumbnail, поэтому
+        результат совпадает с тем, что создаст фоновый генератор.
+        """
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def ready_post_thumbnail(post):
+    return default.backend.get_ready_thumbnail(
+        post.image, POST_GEOMETRY, **POST_OPTIONS
+    )
+
+
+def generate_post_thumbnail(post_id, force=False):
+    """Создаёт миниатюру поста и сбрасывает кэш его карточки и лент."""
+    try:
+        post = Post.objects.only(
+            'id', 'image', 'author_id', 'group_id'
+        ).get(pk=post_id)
+        if not post.image:
+            return
+        if force:
+            default.kvstore.delete_thumbnails(ImageFile(post.image))
+        get_thumbnail(post.image, POST_GEOMETRY, **POST_OPTIONS)
+        bump_version('post', post_id)
+        bump_feed_versions(post_feeds(post))
+    except Post.DoesNotExist:
+        pass
+    finally:
+        with _pending_lock:
+            _pending.discard(post_id)
+
+
+def _enqueue(post_id):
+    with _pending_lock:
+        if post_id in _pending:
+            return
+        _pending.add(post_id)
+    submit(generate_post_thumbnail, post_id)
+
+
+def schedule_post_thumbnail(post_id):
+    """Ставит создание миниатюры в фоновый пул после коммита.
+
+    Повторные вызовы для поста, миниатюра которого уже создаётся,
+    ничего не делают.
+    """
+    transaction.on_commit(lambda: _enqueue(post_id))
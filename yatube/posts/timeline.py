@@ -0,0 +1,220 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from core.background import submit
+from core.sqlite import write_slot
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+from .paginators import KeysetPaginator
+
+TIMELINE_KEYS = ('pub_date', 'post_id')
+
+
+def popular_author_ids(author_ids):
+    """Авторы из author_ids, чьи посты не раскладываются по лентам."""
+    return set(
+        UserCounters.objects.filter(
+            user_id__in=author_ids,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def is_popular(author_id):
+    return author_id in popular_author_ids([author_id])
+
+
+def trim_timeline(user_id):
+    """Удаляет из ленты пользователя всё, что старше TIMELINE_MAX_ENTRIES."""
+    cutoff = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by('-pub_date', '-post_id')
+        .values_list('pub_date', 'post_id')
+        [settings.TIMELINE_MAX_ENTRIES:settings.TIMELINE_MAX_ENTRIES + 1]
+    )
+    for pub_date, post_id in cutoff:
+        TimelineEntry.objects.filter(
+            user_id=user_id,
+            pub_date__lte=pub_date,
+        ).exclude(pub_date=pub_date, post_id__gt=post_id).delete()
+
+
+def trim_timelines(user_ids):
+    """Подрезает ленты пользователей одним DELETE на пачку лент.
+
+    Лишние записи находятся оконной функцией, как в rebuild_timelines.
+    Каждая пачка из TIMELINE_TRIM_BATCH_SIZE лент — отдельная короткая
+    транзакция со своим местом в очереди записей (write_slot).
+    """
+    timeline = TimelineEntry._meta.db_table
+    user_ids = list(user_ids)
+    size = settings.TIMELINE_TRIM_BATCH_SIZE
+    for start in range(0, len(user_ids), size):
+        batch = user_ids[start:start + size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        with write_slot(), transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {timeline} WHERE id IN ('
+                    '  SELECT id FROM ('
+                    '    SELECT id, ROW_NUMBER() OVER ('
+                    '      PARTITION BY user_id'
+                    '      ORDER BY pub_date DESC, post_id DESC'
+                    '    ) AS position'
+                    f'    FROM {timeline} WHERE user_id IN ({placeholders})'
+                    '  ) AS ranked WHERE position > %s'
+                    ')',
+                    [*batch, settings.TIMELINE_MAX_ENTRIES],
+                )
+
+
+@transaction.atomic
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Ленты подрезаются не на каждой публикации, а примерно раз
+    в TIMELINE_TRIM_EVERY постов, и не в транзакции публикации,
+    а в фоне после коммита (см. trim_timelines). Поэтому лента может
+    ненадолго превышать лимит на несколько записей.
+    """
+    if is_popular(post.author_id):
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in follower_ids
+    ], ignore_conflicts=True)
+    if follower_ids and post.pk % settings.TIMELINE_TRIM_EVERY == 0:
+        transaction.on_commit(lambda: submit(trim_timelines, follower_ids))
+
+
+@transaction.atomic
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if is_popular(author_id):
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:settings.TIMELINE_MAX_ENTRIES]
+    )
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+    ], ignore_conflicts=True)
+    trim_timeline(user_id)
+
+
+def prune_timeline(user_id, author_id):
+    """Убирает из ленты посты автора, от которого пользователь отписался."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild_timelines():
+    """Заново строит все ленты одним INSERT ... SELECT.
+
+    Нужна после массовой загрузки данных в обход сигналов; рассчитывает
+    на актуальные UserCounters (см. recount_counters).
+    """
+    timeline = TimelineEntry._meta.db_table
+    TimelineEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {timeline} (user_id, post_id, author_id, pub_date) '
+            'SELECT user_id, post_id, author_id, pub_date FROM ('
+            '  SELECT f.user_id, p.id AS post_id, p.author_id, p.pub_date,'
+            '    ROW_NUMBER() OVER ('
+            '      PARTITION BY f.user_id ORDER BY p.pub_date DESC, p.id DESC'
+            '    ) AS position'
+            f'  FROM {Follow._meta.db_table} f'
+            f'  JOIN {Post._meta.db_table} p ON p.author_id = f.author_id'
+            f'  JOIN {UserCounters._meta.db_table} c'
+            '    ON c.user_id = f.author_id'
+            '  WHERE c.followers_count <= %s'
+            ') AS ranked WHERE position <= %s',
+            [settings.TIMELINE_FANOUT_LIMIT, settings.TIMELINE_MAX_ENTRIES],
+        )
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Курсорная пагинация ленты подписок по материализованной ленте.
+
+    Посты популярных авторов подмешиваются живыми запросами. Если лента
+    пользователя подрезана и закончилась, страница собирается из постов
+    всех авторов, на которых он подписан, чтобы глубокая история не
+    терялась. Живые посты выбираются отдельным запросом на каждого
+    автора по индексу (author, pub_date, id) и сливаются в Python:
+    общий запрос по подпискам сортировал бы посты во временном B-дереве.
+    """
+
+    def __init__(self, object_list, per_page, user):
+        super().__init__(object_list, per_page)
+        self.user = user
+
+    def timeline_is_truncated(self, values, limit):
+        """Могла ли лента быть подрезана до текущей позиции курсора.
+
+        Подрезка удаляет только записи сверх TIMELINE_MAX_ENTRIES, поэтому
+        короткая первая страница (limit не больше лимита) означает, что
+        лента просто кончилась: COUNT(*) по ней не нужен. Глубже первой
+        страницы лента могла быть подрезана, и это проверяется счётом.
+        """
+        cap = settings.TIMELINE_MAX_ENTRIES
+        if values is None and limit <= cap:
+            return False
+        return TimelineEntry.objects.filter(user=self.user).count() >= cap
+
+    def author_posts(self, author_ids, values, newer, limit):
+        """До limit постов каждого автора от курсора, по запросу на автора."""
+        posts = []
+        for author_id in author_ids:
+            posts.extend(self.slice_queryset(
+                Post.objects.for_feed().filter(author_id=author_id),
+                values, newer,
+            )[:limit])
+        return posts
+
+    def merge(self, posts, newer):
+        return sorted(
+            {post.pk: post for post in posts}.values(),
+            key=self.key_values,
+            reverse=not newer,
+        )
+
+    def fetch(self, values, newer, limit):
+        entries = self.slice_queryset(
+            TimelineEntry.objects.filter(user=self.user),
+            values, newer, keys=TIMELINE_KEYS,
+        ).select_related('post__author', 'post__group')[:limit]
+        posts = [entry.post for entry in entries]
+        if (len(posts) < limit and not newer
+                and self.timeline_is_truncated(values, limit)):
+            authors = Follow.objects.filter(user=self.user).values_list(
+                'author_id', flat=True
+            )
+            return self.merge(
+                self.author_posts(authors, values, newer, limit), newer
+            )[:limit]
+        popular = popular_author_ids(
+            Follow.objects.filter(user=self.user).values('author_id')
+        )
+        if popular:
+            posts = self.merge(
+                posts + self.author_posts(popular, values, newer, limit),
+                newer,
+            )
+        return posts[:limit]
@@ -1,85 +1,170 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-
+from core.fragments import cached_shell
+from core.page_cache import cached_page
+from core.sqlite import serialized_writes
 
-def paginator_for_posts(queryset, request):
-    paginator = Paginator(queryset, settings.NUM_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+from .counters import get_counters
+from .etags import (conditional_page, follow_index_etag, group_etag,
+                    group_objects, index_etag, index_objects,
+                    page_version, post_detail_etag, post_detail_objects,
+                    profile_etag, profile_objects)
+from .forms import CommentForm, PostForm
+from .models import Comment, Follow, Group, Post, User
+from .paginators import KeysetPaginator, WindowedPaginator
+from .search import SearchResults
+from .thumbnails import schedule_post_thumbnail
+from .timeline import TimelinePaginator
+
+
+def paginator_for_posts(queryset, request, keyset_paginator=None,
+                        count_key=None):
+    """Постраничный вывод ленты постов.
+
+    По умолчанию лента листается курсорами ?after=/?before= по паре
+    (pub_date, id). Старые ссылки вида ?page=N продолжают работать
+    через нумерованный WindowedPaginator; count_key — ключ ленты,
+    под которым кэшируется число её постов.
+    """
+    if 'page' in request.GET:
+        paginator = WindowedPaginator(
+            queryset, settings.NUM_POSTS, count_key=count_key
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+    else:
+        paginator = keyset_paginator or KeysetPaginator(
+            queryset, settings.NUM_POSTS
+        )
+        page_obj = paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
     return {
         'page_obj': page_obj,
         'paginator': paginator,
     }
 
 
+@conditional_page(index_etag)
+@cached_page(page_version(index_objects))
+@cached_shell(page_version(index_objects))
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     context = {
         'index': True,
     }
-    context.update(paginator_for_posts(post_list, request))
+    context.update(paginator_for_posts(
+        post_list, request, count_key='index'
+    ))
     return render(request, template, context)
 
 
+@conditional_page(group_etag)
+@cached_page(page_version(group_objects))
+@cached_shell(page_version(group_objects))
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.for_feed()
     context = {
         'group': group,
     }
-    context.update(paginator_for_posts(post_list, request))
+    context.update(paginator_for_posts(
+        post_list, request, count_key=f'group:{group.pk}'
+    ))
     return render(request, template, context)
 
 
+@conditional_page(profile_etag)
+@cached_page(page_version(profile_objects))
+@cached_shell(page_version(profile_objects))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username,
+    )
+    post_list = author.posts.for_feed()
     context = {
         'author': author,
+        'counters': get_counters(author),
     }
-    context.update(paginator_for_posts(post_list, request))
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
-        context.update(following=following)
+    context.update(paginator_for_posts(
+        post_list, request, count_key=f'author:{author.pk}'
+    ))
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = WindowedPaginator(SearchResults(query), settings.NUM_POSTS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'query_prefix': urlencode({'q': query}) + '&',
+        'page_obj': page_obj,
+        'paginator': paginator,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def comments_page(post_id, before=None):
+    """Страница комментариев поста: последние, либо старше курсора.
+
+    Комментарии выбираются курсором по (created, id) от новых к старым,
+    а выводятся в хронологическом порядке.
+    """
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        keys=('created', 'id'),
+    )
+    return paginator.get_page(after=before)
+
+
+@conditional_page(post_detail_etag)
+@cached_page(page_version(post_detail_objects))
+@cached_shell(page_version(post_detail_objects))
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = post.author.posts.count()
-    form = CommentForm()
-    comments = post.comments.all()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    post_count = get_counters(post.author).posts_count
     context = {
         'post': post,
         'post_count': post_count,
-        'form': form,
-        'comments': comments
+        'comments': comments_page(post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Фрагмент с более ранними комментариями для подгрузки."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(post.pk, request.GET.get('before')),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
+@serialized_writes
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            schedule_post_thumbnail(post.pk)
         return redirect('posts:profile', request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 @login_required
+@serialized_writes
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
 
@@ -92,7 +177,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if post.image and 'image' in form.changed_data:
+            schedule_post_thumbnail(post.pk)
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', {
         'form': form,
@@ -102,6 +189,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@serialized_writes
 def add_comment(request, post_id):
     post = Post.objects.get(pk=post_id)
     form = CommentForm(request.POST or None)
@@ -114,16 +202,25 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_page(follow_index_etag)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = Post.objects.for_feed().filter(
+        author__following__user=request.user
+    )
     context = {
         'follow': True
     }
-    context.update(paginator_for_posts(post_list, request))
+    context.update(paginator_for_posts(
+        post_list,
+        request,
+        TimelinePaginator(post_list, settings.NUM_POSTS, request.user),
+        count_key=f'follower:{request.user.pk}',
+    ))
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@serialized_writes(safe_methods=True)
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user == author:
@@ -136,6 +233,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@serialized_writes(safe_methods=True)
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -0,0 +1,12 @@
+// Подгружает более ранние комментарии на место ссылки «Показать ещё».
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-comments-more] a');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  var block = link.closest('[data-comments-more]');
+  fetch(link.href)
+    .then(function (response) { return response.text(); })
+    .then(function (html) { block.outerHTML = html; });
+});
@@ -0,0 +1,64 @@
+from django.contrib import admin
+from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+
+from posts.deletion import schedule_user_deletion
+
+User = get_user_model()
+
+
+class BulkDeletionUserAdmin(UserAdmin):
+    """Удаление пользователей только фоновыми пачками, без каскада.
+
+    И действие над списком, и страница удаления одного пользователя
+    блокируют аккаунт и ставят удаление в очередь (см.
+    schedule_user_deletion), не собирая связанные объекты сборщиком.
+    """
+    actions = ('delete_in_background',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_deleted_objects(self, objs, request):
+        # Стандартный подсчёт загрузил бы всю историю пользователя.
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        schedule_user_deletion([obj.pk])
+
+    def response_delete(self, request, obj_display, obj_id):
+        self.message_user(
+            request,
+            f'Пользователь «{obj_display}» поставлен в очередь на удаление.',
+        )
+        return HttpResponseRedirect(add_preserved_filters(
+            {
+                'preserved_filters': self.get_preserved_filters(request),
+                'opts': self.model._meta,
+            },
+            reverse('admin:auth_user_changelist'),
+        ))
+
+    def delete_in_background(self, request, queryset):
+        """Блокирует пользователей и удаляет их с историей в фоне."""
+        user_ids = list(queryset.values_list('pk', flat=True))
+        schedule_user_deletion(user_ids)
+        self.message_user(
+            request,
+            f'Пользователей поставлено в очередь на удаление: '
+            f'{len(user_ids)}.',
+        )
+
+    delete_in_background.short_description = (
+        'Удалить выбранных пользователей в фоне'
+    )
+    delete_in_background.allowed_permissions = ('delete',)
+
+
+admin.site.unregister(User)
+admin.site.register(User, BulkDeletionUserAdmin)
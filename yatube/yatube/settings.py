@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -28,18 +32,20 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.SamplingProfilerMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.FragmentMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
 INTERNAL_IPS = [
@@ -76,6 +82,45 @@ DATABASES = {
     }
 }
 
+# Режим SQLite для продакшена (SQLITE_PRODUCTION=1): WAL и настроенные
+# PRAGMA на каждом соединении, транзакции BEGIN IMMEDIATE, а пишущие
+# представления идут через очередь записей с повторами при блокировке.
+SQLITE_PRODUCTION = os.getenv('SQLITE_PRODUCTION') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_WRITE_QUEUE_SIZE = 64
+SQLITE_WRITE_QUEUE_TIMEOUT = 10
+SQLITE_WRITE_RETRIES = 5
+SQLITE_WRITE_BACKOFF = 0.05
+if SQLITE_PRODUCTION:
+    DATABASES['default']['ENGINE'] = 'core.backends.sqlite3'
+
+# Реплики только для чтения: пути к копиям базы через запятую в
+# DATABASE_REPLICAS (локально их обновляет manage.py sync_replicas).
+# Безопасные запросы читают с реплик, записи идут в default. Движок
+# у реплик тот же, что у основной базы, вместе с PRAGMA продакшена.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': DATABASES['default']['ENGINE'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной базы.
+REPLICA_STICKY_COOKIE = 'primary_reads'
+REPLICA_STICKY_SECONDS = 15
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -94,7 +139,6 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
-
 LANGUAGE_CODE = 'ru'
 
 TIME_ZONE = 'UTC'
@@ -110,8 +154,49 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 STATIC_URL = '/static/'
+
+# Загрузки: файлы больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся на диск
+# частями, а на превысившем UPLOAD_MAX_BYTES загрузка обрывается с 400.
+# Картинки постов больше POST_IMAGE_MAX_PIXELS и анимации больше
+# POST_IMAGE_MAX_FRAMES кадров или POST_IMAGE_MAX_TOTAL_PIXELS пикселей
+# во всех кадрах отклоняются, остальные уменьшаются до POST_IMAGE_MAX_SIDE
+# и пережимаются в POST_IMAGE_FORMAT (JPEG — прогрессивный, или WEBP)
+# без EXIF.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.SizeLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+POST_IMAGE_MAX_FRAMES = 300
+POST_IMAGE_MAX_TOTAL_PIXELS = 100 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_FORMAT = 'JPEG'
+POST_IMAGE_QUALITY = 85
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# Статика для продакшена: collectstatic складывает в STATIC_ROOT файлы
+# с хешем содержимого в имени, manifest и сжатые gzip/brotli копии,
+# а core.middleware.StaticFilesMiddleware отдаёт их с долгим кэшем.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATIC_MAX_AGE = 60
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+# Сессии читаются из кэша и пишутся в кэш и в базу, а пользователь
+# сессии берётся из кэша: запрос авторизованного пользователя обходится
+# без SELECT из django_session и auth_user. ModelBackend остаётся
+# в списке, пока не истекут сессии, созданные до кэша: Django
+# сбрасывает сессию, если записанного в ней бэкенда нет в списке.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = 60 * 60
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -120,10 +205,82 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 NUM_POSTS = 10
 
+COMMENTS_PER_PAGE = 20
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Кэш в файле SQLite, общий для всех процессов сервера на хосте.
+# Тесты (manage.py test или pytest) получают свой временный файл:
+# иначе они видели бы ключи рабочего сервера, а cache.clear() стирал
+# бы его кэш.
+CACHE_DIR = BASE_DIR
+if sys.argv[1:2] == ['test'] or 'pytest' in sys.modules:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
+
+# Лента подписок: сколько записей хранить на пользователя, начиная
+# с какого числа подписчиков автор считается популярным (его посты
+# не раскладываются по лентам, а подмешиваются живым запросом),
+# как часто подрезать ленты при раскладке и сколько лент подписчиков
+# подрезается одним DELETE в фоне.
+TIMELINE_MAX_ENTRIES = 800
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_TRIM_EVERY = 10
+TIMELINE_TRIM_BATCH_SIZE = 100
+
+# Карточки постов кэшируются под версионированным ключом и
+# сбрасываются сигналами, поэтому время жизни может быть большим.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Оболочки страниц (всё, кроме персональных фрагментов) тоже
+# кэшируются под версионированным ключом; 0 — не кэшировать.
+PAGE_SHELL_TIMEOUT = 60 * 60 * 24
+
+# Готовые страницы для гостей хранятся сжатыми под тем же ключом;
+# при промахе страницу рендерит один запрос, остальные ждут до
+# PAGE_CACHE_LOCK_WAIT секунд. 0 в PAGE_CACHE_TIMEOUT — не кэшировать.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+PAGE_CACHE_LOCK_TIMEOUT = 10
+PAGE_CACHE_LOCK_WAIT = 2
+
+# Число постов лент для нумерованной пагинации: ленты авторов берутся
+# из счётчиков, остальные до FEED_COUNT_EXACT_LIMIT постов
+# пересчитываются точно раз в FEED_COUNT_TIMEOUT секунд, большие — в
+# фоне раз в FEED_COUNT_APPROXIMATE_TIMEOUT, а между пересчётами
+# поддерживаются сигналами. Ленты подписок хранятся
+# PAGINATOR_COUNT_TIMEOUT секунд.
+FEED_COUNT_EXACT_LIMIT = 10000
+FEED_COUNT_TIMEOUT = 60 * 60
+FEED_COUNT_APPROXIMATE_TIMEOUT = 60 * 60 * 24
+PAGINATOR_COUNT_TIMEOUT = 60
+
+# Списки в админке: до ADMIN_COUNT_EXACT_LIMIT объектов считаются точно,
+# число объектов больших выборок пересчитывается раз в ADMIN_COUNT_TIMEOUT.
+ADMIN_COUNT_EXACT_LIMIT = 10000
+ADMIN_COUNT_TIMEOUT = 60 * 60
+
+# Фоновый пул потоков (миниатюры и другие отложенные задачи).
+BACKGROUND_WORKERS = 2
+
+# Сколько строк удаляется одной транзакцией при удалении
+# пользователей и постов с большой историей (posts.deletion).
+DELETION_BATCH_SIZE = 500
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.PostThumbnailBackend'
+
+# Профилирование: доля запросов, которые профилируются (0 — выключено),
+# каталог с записями, сколько записей хранить и сколько самых
+# затратных функций сохранять для каждого запроса.
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', '0'))
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILER_MAX_FILES = 1000
+PROFILER_TOP_FUNCTIONS = 40
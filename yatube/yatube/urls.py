@@ -17,9 +17,6 @@ handler403 = 'core.views.permission_denied'
 handler500 = 'core.views.server_error'
 
 if settings.DEBUG:
-    import debug_toolbar
-
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
-    urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)